@@ -0,0 +1,191 @@
+"""ASGI-обёртка над WSGI-приложением Django.
+
+Django 2.2 не умеет исполнять асинхронные представления, поэтому
+запросы выполняются синхронным приложением в пуле потоков, а цикл
+событий сервера (uvicorn, daphne) держит соединения: медленные
+клиенты и долгие ответы не занимают воркер целиком.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class WsgiToAsgi:
+    def __init__(self, application):
+        self.application = application
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS,
+            thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        limit = settings.ASGI_MAX_BODY_SIZE
+        if content_length(scope) > limit:
+            return await self.reject(send)
+        # Большое тело уходит на диск, а не копится в памяти
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            received = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                received += len(chunk)
+                # Content-Length может не быть (chunked) или он врёт
+                if received > limit:
+                    return await self.reject(send)
+                body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await self.handle(scope, body, send, receive)
+        finally:
+            body.close()
+
+    async def reject(self, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': 'Слишком большой запрос'.encode(),
+        })
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle(self, scope, body, send, receive):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        result = await loop.run_in_executor(
+            self.executor, self.application,
+            make_environ(scope, body), start_response
+        )
+        content = getattr(result, 'async_streaming_content', None)
+        if content is not None:
+            return await self.stream(result, content, started, send, receive)
+        iterator = iter(result)
+        try:
+            # Тело читается в пуле: потоковые ответы рендерятся лениво,
+            # заголовки уходят после первого куска
+            chunk = await loop.run_in_executor(
+                self.executor, next, iterator, None
+            )
+            await send({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': started['headers'],
+            })
+            while chunk is not None:
+                if chunk:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+                chunk = await loop.run_in_executor(
+                    self.executor, next, iterator, None
+                )
+        finally:
+            if hasattr(result, 'close'):
+                # close() шлёт request_finished и закрывает соединение с БД
+                await loop.run_in_executor(self.executor, result.close)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def stream(self, result, content, started, send, receive):
+        # Долгий поток (SSE) идёт прямо в цикле событий: ожидание
+        # новых данных не занимает поток пула
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        watcher = asyncio.ensure_future(watch())
+        loop = asyncio.get_running_loop()
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': started['headers'],
+            })
+            async for chunk in content:
+                if watcher.done():
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            else:
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            await content.aclose()
+            await loop.run_in_executor(self.executor, result.close)
+
+
+def content_length(scope):
+    for name, value in scope.get('headers', []):
+        if name.lower() == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+def make_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.notifications import unread_count
+
+
+def notifications(request):
+    # Счётчик читается из кеша и только если шаблон к нему обратился
+    if not request.user.is_authenticated:
+        return {}
+    return {
+        'unread_notifications': SimpleLazyObject(
+            lambda: unread_count(request.user)
+        )
+    }
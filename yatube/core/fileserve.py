@@ -0,0 +1,160 @@
+"""Раздача статики и медиа на уровне WSGI, в обход Django.
+
+Файлы отдаются через ``wsgi.file_wrapper``, который сервер
+(gunicorn, uWSGI) превращает в ``sendfile`` без копирования
+в пространство пользователя. Поддерживаются Range-запросы,
+предсжатые копии .br/.gz и условные запросы. Файлы с хешем
+в имени кешируются браузером навсегда.
+"""
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+from .middleware import accepted_encodings
+
+BLOCK_SIZE = 64 * 1024
+
+# Хеш манифеста статики (name.0123456789ab.css), хеш содержимого
+# картинок постов и миниатюр sorl — такие файлы никогда не меняются
+IMMUTABLE_NAME = re.compile(r'\.[0-9a-f]{12}\.|/[0-9a-f]{32,64}\.')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileServer:
+    def __init__(self, application):
+        self.application = application
+
+    def roots(self):
+        return (
+            (settings.STATIC_URL, settings.STATIC_ROOT),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT),
+        )
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            for prefix, root in self.roots():
+                if root and path.startswith(prefix):
+                    return self.serve(
+                        environ, start_response, root, path[len(prefix):]
+                    )
+        return self.application(environ, start_response)
+
+    def serve(self, environ, start_response, root, name):
+        try:
+            path = safe_join(root, name)
+        except SuspiciousFileOperation:
+            return self.respond(start_response, '404 Not Found')
+        if not os.path.isfile(path):
+            return self.respond(start_response, '404 Not Found')
+        content_type, _ = mimetypes.guess_type(path)
+        headers = [
+            ('Cache-Control',
+             IMMUTABLE if IMMUTABLE_NAME.search(path) else REVALIDATE),
+            ('Accept-Ranges', 'bytes'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        byte_range = environ.get('HTTP_RANGE')
+        # Куски отдаются только из несжатого файла
+        encoding = None
+        if not byte_range:
+            path, encoding = self.negotiate(environ, path)
+        # ETag и дата — того файла, который уйдёт клиенту: у сжатых
+        # копий свой ETag с суффиксом кодировки
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        etag += f'-{encoding}"' if encoding else '"'
+        headers += [
+            ('ETag', etag),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+        ]
+        if self.not_modified(environ, etag, stat.st_mtime):
+            return self.respond(start_response, '304 Not Modified', headers)
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(
+            ('Content-Type', content_type or 'application/octet-stream')
+        )
+        size = stat.st_size
+        if byte_range:
+            return self.serve_range(
+                environ, start_response, path, size, byte_range, headers
+            )
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return wrapper(open(path, 'rb'), BLOCK_SIZE)
+
+    def negotiate(self, environ, path):
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    def serve_range(self, environ, start_response, path, size, value,
+                    headers):
+        match = RANGE.match(value.strip())
+        first, last = match.groups() if match else ('', '')
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start, end = size, 0
+        if start > end or start >= size:
+            headers.append(('Content-Range', f'bytes */{size}'))
+            return self.respond(
+                start_response, '416 Range Not Satisfiable', headers
+            )
+        length = end - start + 1
+        headers += [
+            ('Content-Range', f'bytes {start}-{end}/{size}'),
+            ('Content-Length', str(length)),
+        ]
+        start_response('206 Partial Content', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        return read_range(path, start, length)
+
+    @staticmethod
+    def not_modified(environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag in (tag.strip() for tag in if_none_match.split(','))
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since.timestamp()
+        return False
+
+    @staticmethod
+    def respond(start_response, status, headers=()):
+        start_response(status, list(headers) + [('Content-Length', '0')])
+        return []
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
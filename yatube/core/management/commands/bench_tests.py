@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import default_test_processes
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет тесты последовательно и параллельно и печатает '
+            'ускорение по общему времени.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('labels', nargs='*')
+        parser.add_argument(
+            '--parallel', type=int, default=default_test_processes()
+        )
+
+    def handle(self, *args, **options):
+        serial = self.run(1, options['labels'])
+        parallel = self.run(options['parallel'], options['labels'])
+        self.stdout.write(
+            f'1 процесс: {serial:.2f} с, {options["parallel"]} процесс(ов): '
+            f'{parallel:.2f} с, ускорение ×{serial / parallel:.2f}'
+        )
+
+    def run(self, processes, labels):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'test', f'--parallel={processes}', *labels,
+        ]
+        # Переменная из окружения вызова перебила бы выбор manage.py
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.test_settings'}
+        started = time.monotonic()
+        result = subprocess.run(
+            command, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if result.returncode:
+            raise CommandError(f'Тесты упали: {" ".join(command)}')
+        return time.monotonic() - started
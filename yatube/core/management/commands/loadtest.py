@@ -0,0 +1,79 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: сравнивает пропускную способность '
+            'запущенных серверов (например, gunicorn с yatube.wsgi '
+            'и uvicorn с yatube.asgi) при разном числе соединений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Адреса серверов, например http://127.0.0.1:8000'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Запрашиваемые пути, по умолчанию /.'
+        )
+        parser.add_argument(
+            '--concurrency', default='1,10,50',
+            help='Число одновременных соединений через запятую.'
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        paths = options['paths'] or ['/']
+        levels = [int(n) for n in options['concurrency'].split(',')]
+        self.stdout.write(
+            f'{"сервер":<32}{"соед.":>6}{"зап/с":>10}'
+            f'{"p50 мс":>10}{"p99 мс":>10}{"ошибок":>8}'
+        )
+        for target in options['targets']:
+            for concurrency in levels:
+                self.report(
+                    target, concurrency,
+                    *self.run(target.rstrip('/'), paths, concurrency)
+                )
+
+    def run(self, target, paths, concurrency):
+        local = threading.local()
+        timeout = self.options['timeout']
+
+        def fetch(number):
+            # У каждого потока своё keep-alive соединение
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            url = target + paths[number % len(paths)]
+            started = time.perf_counter()
+            try:
+                response = local.session.get(url, timeout=timeout)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(
+                executor.map(fetch, range(self.options['requests']))
+            )
+        return time.perf_counter() - started, results
+
+    def report(self, target, concurrency, elapsed, results):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(not ok for _, ok in results)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{target:<32}{concurrency:>6}'
+            f'{len(results) / elapsed:>10.1f}'
+            f'{statistics.median(latencies) * 1000:>10.1f}'
+            f'{p99 * 1000:>10.1f}{errors:>8}'
+        )
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import metrics, tasks
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.Task.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--stats-every', type=int, default=60,
+            help='Как часто (сек) печатать гистограммы задержек.'
+        )
+
+    def handle(self, *args, **options):
+        last_report = time.monotonic()
+        try:
+            while True:
+                processed = tasks.run_pending(options['batch_size'])
+                if options['once'] and not processed:
+                    break
+                if time.monotonic() - last_report > options['stats_every']:
+                    self.report()
+                    self.purge()
+                    last_report = time.monotonic()
+                if not processed:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.report()
+
+    def report(self):
+        for line in metrics.lines(tasks.latency):
+            self.stdout.write(line)
+
+    def purge(self):
+        Task.objects.filter(
+            status=Task.DONE,
+            run_at__lt=timezone.now() - timedelta(
+                days=settings.TASKS_KEEP_DONE_DAYS
+            )
+        ).delete()
@@ -0,0 +1,47 @@
+"""Гистограммы задержек в памяти процесса.
+
+Общие для очереди задач (core.tasks) и хешеров паролей
+(users.hashers): значения копятся в словаре гистограмм по ключу,
+а отчёт печатает или пишет в лог тот, кто их собирает.
+"""
+import bisect
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+
+    def percentile(self, fraction):
+        if not self.total:
+            return 0
+        threshold, seen = self.total * fraction, 0
+        for upper, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= threshold:
+                return upper
+        return float('inf')
+
+    def __str__(self):
+        return (f'n={self.total} p50<={self.percentile(0.5)}ms '
+                f'p95<={self.percentile(0.95)}ms '
+                f'p99<={self.percentile(0.99)}ms')
+
+
+def observe(histograms, key, milliseconds):
+    histograms.setdefault(key, Histogram()).observe(milliseconds)
+
+
+def lines(histograms):
+    """Строки отчёта 'имя операция: n=… p50<=…' по ключам (имя, операция)."""
+    return [
+        f'{name} {kind}: {histogram}'
+        for (name, kind), histogram in sorted(histograms.items())
+    ]
@@ -0,0 +1,162 @@
+import gzip
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import ratelimit
+from .views import rate_limited
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/(?!event-stream)|application/(json|javascript|xml)|'
+    r'image/svg\+xml)'
+)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, исключая запрещённые через q=0."""
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_LEVEL)
+    for item in sequence:
+        # flush после каждого куска, чтобы не задерживать отправку
+        chunk = compressor.process(item) + compressor.flush()
+        if chunk:
+            yield chunk
+    yield compressor.finish()
+
+
+def gzip_sequence(sequence):
+    # wbits=31 — формат gzip; SYNC_FLUSH после каждого куска, чтобы
+    # шапка страницы уходила клиенту раньше записей
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, wbits=31)
+    for item in sequence:
+        chunk = compressor.compress(item) + compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов brotli или gzip, в том числе потоковых.
+
+    Ответы с CSRF-токеном не сжимаются: сжатие секрета рядом
+    с данными из запроса открывает атаку BREACH.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        if request.META.get('CSRF_COOKIE_USED'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            compress = brotli_sequence if encoding == 'br' else (
+                gzip_sequence
+            )
+            response.streaming_content = compress(response.streaming_content)
+            del response['Content-Length']
+        elif not self.compress_content(response, encoding):
+            return response
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое представление не побайтно равно исходному
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def choose_encoding(request):
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    @staticmethod
+    def compress_content(response, encoding):
+        if encoding == 'br':
+            compressed = brotli.compress(
+                response.content, quality=settings.COMPRESSION_BROTLI_LEVEL
+            )
+        else:
+            compressed = gzip.compress(
+                response.content, settings.COMPRESSION_GZIP_LEVEL
+            )
+        if len(compressed) >= len(response.content):
+            return False
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        return True
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Ответ 429 на слишком частые запросы к view из RATE_LIMITS.
+
+    Правило задаётся по имени view ('posts:add_comment'): лимиты
+    'user' (для вошедших) и 'ip' вида '10/m' и методы, которые
+    считаются (по умолчанию только POST).
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.view_name
+        rule = settings.RATE_LIMITS.get(name)
+        if rule is None or request.method not in rule.get(
+            'methods', ('POST',)
+        ):
+            return None
+        keys = []
+        if 'user' in rule and request.user.is_authenticated:
+            keys.append((f'{name}:user:{request.user.pk}', rule['user']))
+        if 'ip' in rule:
+            keys.append((f'{name}:ip:{client_ip(request)}', rule['ip']))
+        retry_after = ratelimit.hit(keys)
+        if not retry_after:
+            return None
+        return rate_limited(request, retry_after)
+
+
+def client_ip(request):
+    # За прокси адрес клиента берётся из его заголовка
+    # (RATELIMIT_IP_HEADER): начало X-Forwarded-For клиент пишет сам,
+    # поэтому адрес отсчитывается с конца на RATELIMIT_PROXY_HOPS
+    remote = request.META.get('REMOTE_ADDR', '')
+    value = request.META.get(settings.RATELIMIT_IP_HEADER, '')
+    addresses = [item.strip() for item in value.split(',') if item.strip()]
+    hops = settings.RATELIMIT_PROXY_HOPS
+    if len(addresses) < hops or hops < 1:
+        return remote
+    return addresses[-hops]
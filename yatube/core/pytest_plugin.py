@@ -0,0 +1,36 @@
+"""Плагин pytest для поиска N+1.
+
+Фикстура ``query_guard`` записывает запросы к БД каждого запроса
+к сайту в тесте и роняет тест, если одна и та же форма SQL
+повторилась больше ``--max-repeated-queries`` раз. С опцией
+``--query-guard`` проверка включается для всех тестов.
+"""
+import pytest
+
+from core.query_guard import QueryGuard
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('query-guard')
+    group.addoption(
+        '--query-guard', action='store_true',
+        help='Проверять повторяющиеся запросы во всех тестах.'
+    )
+    group.addoption(
+        '--max-repeated-queries', type=int, default=3,
+        help='Сколько раз одна форма SQL может выполниться за запрос.'
+    )
+
+
+@pytest.fixture
+def query_guard(request):
+    limit = request.config.getoption('max_repeated_queries')
+    with QueryGuard(limit) as guard:
+        yield guard
+    guard.check()
+
+
+@pytest.fixture(autouse=True)
+def _query_guard_everywhere(request):
+    if request.config.getoption('query_guard'):
+        request.getfixturevalue('query_guard')
@@ -0,0 +1,120 @@
+"""Поиск N+1: повторяющиеся запросы внутри одного запроса к сайту.
+
+QueryGuard записывает SQL каждого запроса к сайту, сводит его
+к форме без литералов и проверяет, что ни одна форма не
+повторяется больше max_repeats раз. Для каждой формы в отчёте
+указано, откуда она выполнялась: строка шаблона, если запрос
+случился при рендере, иначе ближайший кадр кода проекта.
+"""
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?),?)+\s*\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+# Управление транзакциями (atomic, savepoint) повторяется законно
+TRANSACTION_CONTROL = re.compile(
+    r'\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE
+)
+# Хранилище sorl — кеш перед БД, его промахи не связаны с N+1
+IGNORED_TABLES = ('thumbnail_kvstore',)
+
+
+def normalize(sql):
+    sql = LITERALS.sub('?', sql)
+    sql = IN_LIST.sub('IN (...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def template_origin(frame):
+    # Ближайший узел шаблона на стеке и есть строка, вызвавшая запрос
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if (frame.f_code.co_name == 'render_annotated'
+                and getattr(node, 'token', None) is not None
+                and getattr(node, 'origin', None) is not None):
+            name = node.origin.template_name or node.origin.name
+            return f'{name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def python_origin(frame):
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(settings.BASE_DIR) and filename != __file__:
+            name = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{name}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return '<django>'
+
+
+class QueryGuard:
+    def __init__(self, max_repeats, ignored_tables=IGNORED_TABLES):
+        self.max_repeats = max_repeats
+        self.ignored_tables = ignored_tables
+        self.requests = []
+        self.current = None
+
+    def __enter__(self):
+        request_started.connect(self.start_request)
+        request_finished.connect(self.finish_request)
+        self.wrappers = [
+            connection.execute_wrapper(self.record)
+            for connection in connections.all()
+        ]
+        for wrapper in self.wrappers:
+            wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for wrapper in reversed(self.wrappers):
+            wrapper.__exit__(*exc_info)
+        request_started.disconnect(self.start_request)
+        request_finished.disconnect(self.finish_request)
+
+    def start_request(self, environ=None, **kwargs):
+        path = (environ or {}).get('PATH_INFO', '?')
+        self.current = (path, defaultdict(list))
+        self.requests.append(self.current)
+
+    def finish_request(self, **kwargs):
+        # Запросы теста между обращениями к сайту не учитываются
+        self.current = None
+
+    def record(self, execute, sql, params, many, context):
+        if (self.current is not None
+                and not TRANSACTION_CONTROL.match(sql)
+                and not any(table in sql for table in self.ignored_tables)):
+            frame = sys._getframe(1)
+            origin = template_origin(frame) or python_origin(frame)
+            self.current[1][normalize(sql)].append(origin)
+        return execute(sql, params, many, context)
+
+    def violations(self):
+        for path, statements in self.requests:
+            for sql, origins in statements.items():
+                if len(origins) > self.max_repeats:
+                    yield path, sql, origins
+
+    def report(self):
+        lines = []
+        for path, sql, origins in self.violations():
+            lines.append(f'{path}: {len(origins)} раз(а) {sql}')
+            for origin, count in Counter(origins).most_common():
+                lines.append(f'    {count} × {origin}')
+        return '\n'.join(lines)
+
+    def check(self):
+        report = self.report()
+        if report:
+            raise AssertionError(
+                'Повторяющиеся запросы (больше '
+                f'{self.max_repeats} на запрос к сайту):\n{report}'
+            )
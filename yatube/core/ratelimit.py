@@ -0,0 +1,68 @@
+"""Ограничение частоты запросов скользящим окном в кеше.
+
+Окно приближается двумя соседними фиксированными окнами: число
+запросов предыдущего окна берётся с весом оставшейся в нём доли
+времени. На каждый ключ в кеше лежат только два счётчика, а
+проверка стоит одного get_many и одного incr на ключ.
+Правила задаются в RATE_LIMITS по имени view (см. RateLimitMiddleware).
+"""
+import math
+import time
+
+from django.core.cache import cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY = 'ratelimit:{}:{}:{}'
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)."""
+    count, _, unit = rate.partition('/')
+    return int(count), PERIODS[unit]
+
+
+def _retry_after(previous, current, limit, period, elapsed):
+    if current >= limit:
+        return period - elapsed
+    # Вес предыдущего окна падает со временем; ждём, пока оценка
+    # не опустится ниже предела
+    return period * (1 - (limit - current) / previous) - elapsed
+
+
+def hit(rules, now=None):
+    """Учитывает запрос по правилам [(ключ, '10/m'), ...].
+
+    Возвращает 0, если запрос разрешён, иначе — через сколько секунд
+    повторить. Отклонённый запрос в счётчики не попадает.
+    """
+    now = time.time() if now is None else now
+    windows = []
+    for key, rate in rules:
+        limit, period = parse_rate(rate)
+        window, elapsed = divmod(now, period)
+        windows.append((
+            KEY.format(key, period, int(window) - 1),
+            KEY.format(key, period, int(window)),
+            limit, period, elapsed,
+        ))
+    counts = cache.get_many(
+        [key for previous, current, *_ in windows
+         for key in (previous, current)]
+    )
+    retry_after = None
+    for previous_key, current_key, limit, period, elapsed in windows:
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+        if previous * (1 - elapsed / period) + current >= limit:
+            retry_after = max(retry_after or 0, _retry_after(
+                previous, current, limit, period, elapsed
+            ))
+    if retry_after is not None:
+        return max(1, math.ceil(retry_after))
+    for previous_key, current_key, limit, period, elapsed in windows:
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # Счётчик нужен ещё одно окно — как предыдущий для следующего
+            cache.add(current_key, 1, period * 2)
+    return 0
@@ -0,0 +1,105 @@
+import gzip
+import os
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml',
+                '.map', '.ico')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешированными именами и сжатыми копиями .gz/.br.
+
+    Сжатые копии кладутся рядом с файлом при collectstatic,
+    чтобы отдавать их без сжатия на лету, см. core.fileserve.
+    """
+
+    def post_process(self, *args, **kwargs):
+        # Манифест проходит по файлам несколько раз, сжимаем однажды
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(
+            *args, **kwargs
+        ):
+            if isinstance(processed, Exception):
+                yield name, hashed_name, processed
+                continue
+            if hashed_name and hashed_name not in compressed:
+                self.compress(hashed_name)
+                compressed.add(hashed_name)
+            yield name, hashed_name, processed
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        variants = [('.gz', gzip.compress(data, 9))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+@deconstructible
+class InMemoryStorage(Storage):
+    """Файлы в словаре процесса вместо диска: для тестов.
+
+    Словарь общий для всех экземпляров, как общая файловая система:
+    sorl создаёт своё хранилище заново при каждом обращении.
+    """
+    files = {}
+
+    def _open(self, name, mode='rb'):
+        data, modified = self.files[name]
+        return ContentFile(data, name=name)
+
+    def _save(self, name, content):
+        self.files[name] = (
+            b''.join(content.chunks()), timezone.now()
+        )
+        return name
+
+    def delete(self, name):
+        self.files.pop(name, None)
+
+    def exists(self, name):
+        return name in self.files
+
+    def size(self, name):
+        return len(self.files[name][0])
+
+    def get_modified_time(self, name):
+        return self.files[name][1]
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = set(), []
+        for name in self.files:
+            if not name.startswith(prefix):
+                continue
+            head, _, tail = name[len(prefix):].partition('/')
+            if tail:
+                directories.add(head)
+            else:
+                files.append(head)
+        return sorted(directories), sorted(files)
+
+    def url(self, name):
+        return urljoin(settings.MEDIA_URL, filepath_to_uri(name))
@@ -0,0 +1,143 @@
+"""Простая очередь фоновых задач на базе таблицы ``core.Task``.
+
+Задачи регистрируются декоратором ``task`` в модулях ``tasks.py``
+приложений, ставятся в очередь через ``enqueue`` и выполняются
+командой ``run_worker``.
+"""
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# Гистограммы по имени задачи: время выполнения и полное время
+# от постановки в очередь до завершения
+latency = {}
+
+
+def task(name, max_retries=None):
+    def decorator(func):
+        func.task_name = name
+        func.max_retries = (
+            settings.TASKS_MAX_RETRIES if max_retries is None
+            else max_retries
+        )
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, **payload):
+    """Ставит задачу в очередь.
+
+    Повтор с тем же ключом игнорируется, пока задача ждёт в очереди;
+    взятая воркером задача ключ освобождает.
+    """
+    if settings.TASKS_ALWAYS_EAGER:
+        return registry[name](**payload)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name, key=key, payload=json.dumps(payload)
+            )
+    except IntegrityError:
+        return None
+
+
+def backoff(attempts):
+    delay = settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return min(delay, settings.TASKS_RETRY_BACKOFF_MAX) * random.uniform(
+        0.8, 1.2
+    )
+
+
+def run(task_obj):
+    func = registry.get(task_obj.name)
+    started = time.monotonic()
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task_obj.name}')
+        func(**json.loads(task_obj.payload))
+    except Exception as error:
+        task_obj.attempts += 1
+        task_obj.last_error = repr(error)
+        max_retries = getattr(func, 'max_retries', 0)
+        if task_obj.attempts > max_retries:
+            task_obj.status = Task.FAILED
+            logger.exception('Задача %s провалена', task_obj)
+        else:
+            task_obj.status = Task.PENDING
+            task_obj.run_at = timezone.now() + timedelta(
+                seconds=backoff(task_obj.attempts)
+            )
+        task_obj.save(
+            update_fields=('status', 'attempts', 'last_error', 'run_at')
+        )
+        return False
+    metrics.observe(
+        latency, (task_obj.name, 'run'),
+        (time.monotonic() - started) * 1000
+    )
+    metrics.observe(
+        latency, (task_obj.name, 'total'),
+        (timezone.now() - task_obj.created).total_seconds() * 1000
+    )
+    task_obj.status = Task.DONE
+    task_obj.save(update_fields=('status',))
+    return True
+
+
+def reclaim_expired():
+    """Возвращает в очередь задачи, брошенные упавшими воркерами."""
+    expired = Task.objects.filter(
+        status=Task.RUNNING,
+        started_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_LEASE_TIMEOUT
+        )
+    )
+    reclaimed = 0
+    for task_obj in expired:
+        # Падение воркера засчитывается попыткой: задача, которая
+        # роняет воркер, не будет возвращаться бесконечно
+        attempts = task_obj.attempts + 1
+        max_retries = getattr(registry.get(task_obj.name), 'max_retries', 0)
+        reclaimed += Task.objects.filter(
+            pk=task_obj.pk, status=Task.RUNNING,
+            started_at=task_obj.started_at
+        ).update(
+            status=Task.FAILED if attempts > max_retries else Task.PENDING,
+            attempts=attempts,
+            last_error='Истекла аренда воркера',
+        )
+    if reclaimed:
+        logger.warning('Возвращено брошенных задач: %s', reclaimed)
+    return reclaimed
+
+
+def run_pending(batch_size=None):
+    """Выполняет готовые к запуску задачи, возвращает их количество."""
+    reclaim_expired()
+    candidates = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=timezone.now()
+    ).order_by('run_at')[:batch_size or settings.TASKS_BATCH_SIZE]
+    processed = 0
+    for task_obj in candidates:
+        # Захватываем задачу атомарно, чтобы воркеры не пересекались
+        claimed = Task.objects.filter(
+            pk=task_obj.pk, status=Task.PENDING
+        ).update(status=Task.RUNNING, key=None, started_at=timezone.now())
+        if claimed:
+            run(task_obj)
+            processed += 1
+    return processed
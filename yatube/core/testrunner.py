@@ -0,0 +1,78 @@
+import sys
+import time
+import unittest
+
+from django.core.cache import caches
+from django.test.runner import (
+    DebugSQLTextTestResult, DiscoverRunner, ParallelTestSuite,
+    RemoteTestResult, RemoteTestRunner, default_test_processes
+)
+
+from .storage import InMemoryStorage
+
+
+class IsolatedCacheMixin:
+    # Кеш в памяти процесса не откатывается вместе с транзакцией
+    # теста: без очистки значения одного теста видны следующему
+    def startTest(self, test):
+        for cache in caches.all():
+            cache.clear()
+        super().startTest(test)
+
+
+class IsolatedTextTestResult(IsolatedCacheMixin, unittest.TextTestResult):
+    pass
+
+
+class IsolatedDebugSQLTextTestResult(IsolatedCacheMixin,
+                                     DebugSQLTextTestResult):
+    pass
+
+
+class IsolatedRemoteTestResult(IsolatedCacheMixin, RemoteTestResult):
+    pass
+
+
+class IsolatedRemoteTestRunner(RemoteTestRunner):
+    resultclass = IsolatedRemoteTestResult
+
+
+class IsolatedParallelTestSuite(ParallelTestSuite):
+    runner_class = IsolatedRemoteTestRunner
+
+
+class ParallelTestRunner(DiscoverRunner):
+    """DiscoverRunner, по умолчанию параллельный на всех ядрах.
+
+    Каждый процесс получает свою копию тестовой базы; число процессов
+    задаётся --parallel или DJANGO_TEST_PROCESSES. Перед каждым тестом
+    кеш очищается, поэтому результат не зависит от того, как тесты
+    разложены по процессам. В конце печатается общее время прогона.
+    """
+    parallel_test_suite = IsolatedParallelTestSuite
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel=default_test_processes())
+
+    def get_resultclass(self):
+        if self.debug_sql:
+            return IsolatedDebugSQLTextTestResult
+        return IsolatedTextTestResult
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        # Картинки и миниатюры тестов не переживают прогон
+        InMemoryStorage.files.clear()
+
+    def run_tests(self, *args, **kwargs):
+        started = time.monotonic()
+        failures = super().run_tests(*args, **kwargs)
+        if self.verbosity:
+            print(
+                f'Время прогона: {time.monotonic() - started:.2f} с, '
+                f'процессов: {self.parallel}',
+                file=sys.stderr
+            )
+        return failures
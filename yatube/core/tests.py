@@ -1,6 +1,45 @@
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from datetime import timedelta
 from http import HTTPStatus
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import engines
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+
+from . import ratelimit, tasks
+from .asgi import WsgiToAsgi
+from .fileserve import FileServer
+from .middleware import CompressionMiddleware, client_ip
+from .models import Task
+from .query_guard import QueryGuard, normalize
+
+calls = []
+
+
+@tasks.task('core.test_task', max_retries=1)
+def collect(value):
+    calls.append(value)
+
+
+@tasks.task('core.failing_task', max_retries=1)
+def fail():
+    raise RuntimeError('сбой')
 
 
 class ViewTestClass(TestCase):
@@ -11,3 +50,397 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        tasks.latency.clear()
+
+    def test_task_runs_once_per_key(self):
+        """Задача с тем же ключом идемпотентности ставится один раз."""
+        tasks.enqueue('core.test_task', key='same', value=1)
+        tasks.enqueue('core.test_task', key='same', value=1)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertEqual(tasks.latency[('core.test_task', 'run')].total, 1)
+        # Взятая задача освобождает ключ: следующее изменение не теряется
+        tasks.enqueue('core.test_task', key='same', value=2)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [1, 2])
+
+    def test_expired_running_task_reclaimed(self):
+        """Задача, брошенная упавшим воркером, возвращается в очередь."""
+        task = tasks.enqueue('core.test_task', value=1)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.RUNNING,
+            started_at=timezone.now() - timedelta(
+                seconds=settings.TASKS_LEASE_TIMEOUT + 1
+            )
+        )
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+        self.assertEqual(task.attempts, 1)
+
+    def test_failed_task_retried_with_backoff(self):
+        """Упавшая задача откладывается, а после лимита помечается failed."""
+        task = tasks.enqueue('core.failing_task')
+        tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_at, timezone.now())
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertIn('сбой', task.last_error)
+
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class FileServerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.content = b'body { color: red; }' * 50
+        cls.name = 'css/site.0123456789ab.css'
+        os.makedirs(os.path.join(TEMP_STATIC_ROOT, 'css'))
+        path = os.path.join(TEMP_STATIC_ROOT, cls.name)
+        with open(path, 'wb') as file:
+            file.write(cls.content)
+        with open(path + '.gz', 'wb') as file:
+            file.write(gzip.compress(cls.content))
+        cls.server = FileServer(lambda environ, start_response: [b'django'])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def request(self, path, **headers):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers}
+        result = {}
+
+        def start_response(status, response_headers):
+            result['status'] = status
+            result['headers'] = dict(response_headers)
+
+        body = b''.join(self.server(environ, start_response))
+        return result['status'], result['headers'], body
+
+    def test_hashed_file_cached_forever(self):
+        """Файл с хешем в имени отдаётся с Cache-Control immutable."""
+        status, headers, body = self.request('/static/' + self.name)
+        self.assertEqual(status, '200 OK')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(body, self.content)
+
+    def test_precompressed_sibling_served(self):
+        """При поддержке gzip отдаётся заранее сжатая копия."""
+        status, headers, body = self.request(
+            '/static/' + self.name, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.content)
+        _, plain, _ = self.request('/static/' + self.name)
+        self.assertNotEqual(headers['ETag'], plain['ETag'])
+        # gzip;q=0 запрещает сжатие, а не просит его
+        _, headers, body = self.request(
+            '/static/' + self.name, HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, self.content)
+
+    def test_range_request(self):
+        """Range-запрос возвращает 206 с запрошенным куском."""
+        status, headers, body = self.request(
+            '/static/' + self.name, HTTP_RANGE='bytes=5-9'
+        )
+        self.assertEqual(status, '206 Partial Content')
+        self.assertEqual(body, self.content[5:10])
+        self.assertEqual(
+            headers['Content-Range'], f'bytes 5-9/{len(self.content)}'
+        )
+        status, _, _ = self.request(
+            '/static/' + self.name, HTTP_RANGE='bytes=100000-'
+        )
+        self.assertEqual(status, '416 Range Not Satisfiable')
+
+    def test_not_modified_and_fallthrough(self):
+        """Совпавший ETag даёт 304, прочие пути уходят в Django."""
+        _, headers, _ = self.request('/static/' + self.name)
+        status, _, _ = self.request(
+            '/static/' + self.name, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual(status, '304 Not Modified')
+        status, _, _ = self.request('/static/../settings.py')
+        self.assertEqual(status, '404 Not Found')
+        self.assertEqual(
+            b''.join(self.server(
+                {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, None
+            )),
+            b'django'
+        )
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = '<p>Последние обновления на сайте</p>' * 100
+
+    def process(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_html_compressed(self):
+        """Большой HTML-ответ сжимается и получает Vary."""
+        response = self.process(HttpResponse(self.body))
+        self.assertIn(response['Content-Encoding'], ('gzip', 'br'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        if response['Content-Encoding'] == 'gzip':
+            self.assertEqual(
+                gzip.decompress(response.content).decode(), self.body
+            )
+
+    def test_streaming_compressed_incrementally(self):
+        """Потоковый ответ сжимается по кускам."""
+        response = self.process(StreamingHttpResponse(
+            chunk.encode() for chunk in [self.body] * 3
+        ), accept_encoding='gzip;q=1, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            self.body * 3
+        )
+
+    def test_streaming_chunks_flushed(self):
+        """Каждый кусок потока сжимается и уходит сразу."""
+        produced = []
+
+        def chunks():
+            for number in range(3):
+                produced.append(number)
+                yield self.body.encode()
+
+        response = self.process(
+            StreamingHttpResponse(chunks()), accept_encoding='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        decompressor = zlib.decompressobj(wbits=31)
+        first = next(iter(response.streaming_content))
+        self.assertEqual(produced, [0])
+        self.assertEqual(decompressor.decompress(first).decode(), self.body)
+
+    def test_small_and_csrf_responses_not_compressed(self):
+        """Маленькие ответы и ответы с CSRF-токеном не сжимаются."""
+        response = self.process(HttpResponse('короткий'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        request.META['CSRF_COOKIE_USED'] = True
+        response = CompressionMiddleware(
+            lambda request: HttpResponse(self.body)
+        )(request)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+def echo_app(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    yield environ['PATH_INFO'].encode('latin1')
+    yield b'?' + environ['QUERY_STRING'].encode()
+    yield b'|' + environ['wsgi.input'].read()
+
+
+class WsgiToAsgiTests(SimpleTestCase):
+    def call(self, application, path='/', body=b''):
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': path,
+            'query_string': b'page=2', 'headers': [(b'x-test', b'1')],
+        }
+        messages = [
+            {'type': 'http.request', 'body': body[:2], 'more_body': True},
+            {'type': 'http.request', 'body': body[2:]},
+        ]
+        sent = []
+
+        async def receive():
+            if not messages:
+                # Клиент не отключается
+                await asyncio.Event().wait()
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        return scope, receive, send, sent
+
+    def test_request_translated(self):
+        """Запрос и потоковый ответ переводятся между ASGI и WSGI."""
+        scope, receive, send, sent = self.call(
+            echo_app, '/группа/', b'text=1'
+        )
+        asyncio.run(WsgiToAsgi(echo_app)(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), sent[0]['headers'])
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in sent[1:]),
+            '/группа/?page=2|text=1'.encode()
+        )
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_requests_run_concurrently(self):
+        """Синхронное приложение обслуживает запросы параллельно."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def slow_app(environ, start_response):
+            barrier.wait()
+            start_response('200 OK', [])
+            return [b'ok']
+
+        application = WsgiToAsgi(slow_app)
+
+        async def main():
+            calls = [self.call(slow_app) for _ in range(3)]
+            await asyncio.gather(*(
+                application(scope, receive, send)
+                for scope, receive, send, _ in calls
+            ))
+            return [sent for *_, sent in calls]
+
+        for sent in asyncio.run(main()):
+            self.assertEqual(sent[0]['status'], 200)
+
+    @override_settings(ASGI_MAX_BODY_SIZE=4)
+    def test_large_body_rejected(self):
+        """Слишком большое тело получает 413 без вызова приложения."""
+        def app(environ, start_response):
+            raise AssertionError('приложение не вызывается')
+
+        scope, receive, send, sent = self.call(app, body=b'text=1')
+        asyncio.run(WsgiToAsgi(app)(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 413)
+        scope, receive, send, sent = self.call(app, body=b'ok')
+        scope['headers'].append((b'content-length', b'100'))
+        asyncio.run(WsgiToAsgi(app)(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 413)
+
+    def test_async_stream_runs_on_event_loop(self):
+        """Асинхронный поток ответа отдаётся без пула потоков."""
+        class Result(list):
+            closed = False
+
+            async def chunks(self):
+                yield b'data: 1\n\n'
+                yield b'data: 2\n\n'
+
+            def close(self):
+                self.closed = True
+
+        result = Result()
+        result.async_streaming_content = result.chunks()
+
+        def stream_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/event-stream')])
+            return result
+
+        scope, receive, send, sent = self.call(stream_app)
+        asyncio.run(WsgiToAsgi(stream_app)(scope, receive, send))
+        self.assertEqual(
+            [message.get('body') for message in sent[1:]],
+            [b'data: 1\n\n', b'data: 2\n\n', b'']
+        )
+        self.assertTrue(result.closed)
+
+
+class QueryGuardTests(TestCase):
+    def test_normalize(self):
+        """Литералы и списки IN сводятся к одной форме запроса."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x'  AND b IN (%s, %s)"),
+            normalize("SELECT * FROM t WHERE a = 'y' AND b IN (%s)")
+        )
+
+    def test_repeated_query_reported_with_template_line(self):
+        """Повтор выше порога падает с указанием строки шаблона."""
+        users = get_user_model().objects
+        for number in range(3):
+            users.create_user(username=f'user{number}')
+        template = engines['django'].from_string(
+            '{% for user in users %}\n{{ user.groups.count }}{% endfor %}'
+        )
+        with QueryGuard(max_repeats=2) as guard:
+            request_started.send(None, environ={'PATH_INFO': '/users/'})
+            template.render({'users': users.all()})
+            request_finished.send(None)
+            users.count()
+        with self.assertRaisesRegex(AssertionError, r'/users/: 3 .*\n'
+                                    r'\s+3 × <unknown source>:2'):
+            guard.check()
+
+    def test_transaction_control_not_counted(self):
+        """BEGIN, SAVEPOINT и RELEASE не считаются повторами."""
+        guard = QueryGuard(max_repeats=1)
+        guard.start_request({'PATH_INFO': '/save/'})
+        for _ in range(3):
+            for sql in ('BEGIN', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"',
+                        'ROLLBACK', 'COMMIT'):
+                guard.record(lambda *args: None, sql, None, False, {})
+        guard.check()
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_within_window(self):
+        """Сверх предела запросы отклоняются до конца окна."""
+        rules = [('test', '3/m')]
+        for _ in range(3):
+            self.assertEqual(ratelimit.hit(rules, now=600), 0)
+        self.assertEqual(ratelimit.hit(rules, now=610), 50)
+
+    def test_previous_window_weighted(self):
+        """Прошлое окно учитывается с весом оставшейся доли времени."""
+        rules = [('test', '4/m')]
+        for _ in range(4):
+            ratelimit.hit(rules, now=600)
+        # Прошла половина нового окна: из прошлого засчитано 2
+        self.assertEqual(ratelimit.hit(rules, now=690), 0)
+        self.assertEqual(ratelimit.hit(rules, now=690), 0)
+        self.assertEqual(ratelimit.hit(rules, now=690), 1)
+        # Через три четверти окна из прошлого засчитана 1
+        self.assertEqual(ratelimit.hit(rules, now=705), 0)
+
+    @override_settings(
+        RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATELIMIT_PROXY_HOPS=1
+    )
+    def test_client_ip_from_trusted_hop(self):
+        """Адрес берётся от своего прокси, а не из подделанного начала."""
+        factory = RequestFactory()
+        request = factory.get(
+            '/', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2',
+            REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(client_ip(request), '2.2.2.2')
+        request = factory.get('/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '10.0.0.1')
+
+    @override_settings(RATE_LIMITS={'posts:add_comment': {'user': '1/m'}})
+    def test_view_returns_429(self):
+        """Частые комментарии получают 429 с Retry-After."""
+        user = get_user_model().objects.create_user(username='spammer')
+        post = Post.objects.create(author=user, text='Текст')
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:add_comment', args=[post.pk])
+        self.assertEqual(client.post(url, {'text': 'Раз'}).status_code, 302)
+        response = client.post(url, {'text': 'Два'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(client.get(url).status_code, 302)
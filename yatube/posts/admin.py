@@ -4,15 +4,23 @@ from .models import Group, Post
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = (
+        'pk', 'text', 'pub_date', 'author', 'group', 'deleted_at'
+    )
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        # Админка показывает и мягко удалённые записи
+        return Post.all_objects.all()
+
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'title', 'slug', 'description')
+    list_display = (
+        'pk', 'title', 'slug', 'description', 'post_count', 'last_post_at'
+    )
     search_fields = ('text',)
     empty_value_display = '-пусто-'
 
@@ -0,0 +1,73 @@
+"""Архив старых записей.
+
+Ленты читают только posts_post, поэтому записи старше
+ARCHIVE_AFTER_MONTHS месяцев вместе с комментариями переносятся
+командой archive_posts в отдельные таблицы ArchivedPost и
+ArchivedComment. Страница записи ищет её сначала среди живых
+записей, затем в архиве. История правок и уведомления записи
+при переносе удаляются.
+"""
+import calendar
+
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = (
+    'text', 'pub_date', 'author_id', 'group_id', 'image', 'image_width',
+    'image_height', 'deleted_at',
+)
+COMMENT_FIELDS = ('post_id', 'author_id', 'text', 'created')
+
+
+def months_ago(months, now=None):
+    now = now or timezone.now()
+    year, month = divmod(now.month - 1 - months, 12)
+    year, month = now.year + year, month + 1
+    day = min(now.day, calendar.monthrange(year, month)[1])
+    return now.replace(year=year, month=month, day=day)
+
+
+def find_post(post_id):
+    """Живая запись или, если её уже перенесли, архивная."""
+    for queryset in (
+        Post.objects,
+        ArchivedPost.objects.filter(deleted_at__isnull=True),
+    ):
+        post = queryset.select_related('author', 'group').filter(
+            pk=post_id
+        ).first()
+        if post is not None:
+            return post
+    raise Http404
+
+
+def _copy(model, source, fields):
+    return model(
+        id=source.pk,
+        **{field: getattr(source, field) for field in fields}
+    )
+
+
+def archive_batch(before, batch_size):
+    """Переносит в архив до batch_size записей старше before."""
+    with transaction.atomic():
+        posts = list(
+            Post.all_objects.filter(pub_date__lt=before)
+            .order_by('pk').select_for_update()[:batch_size]
+        )
+        if not posts:
+            return 0
+        ArchivedPost.objects.bulk_create(
+            _copy(ArchivedPost, post, POST_FIELDS) for post in posts
+        )
+        ArchivedComment.objects.bulk_create(
+            _copy(ArchivedComment, comment, COMMENT_FIELDS)
+            for comment in Comment.objects.filter(post__in=posts).iterator()
+        )
+        # Удаление проходит через сигналы: счётчики лент и групп
+        # уменьшаются, а картинку удерживает архивная запись
+        Post.all_objects.filter(pk__in=[post.pk for post in posts]).delete()
+    return len(posts)
@@ -0,0 +1,119 @@
+"""Очередь отложенной записи комментариев.
+
+Провалидированные комментарии складываются в локальный SQLite-файл
+в режиме WAL, а фоновый обработчик (команда ``drain_comments``)
+переносит их в основную БД пачками через ``bulk_create``.
+У каждого комментария есть client_id, уникальный и в БД: пачка,
+перенесённая до сбоя, но не удалённая из очереди, не запишется
+повторно.
+"""
+import sqlite3
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import notifications
+from .models import Comment, Post
+
+User = get_user_model()
+
+_local = threading.local()
+
+
+def _connection():
+    path = settings.COMMENT_QUEUE_PATH
+    if getattr(_local, 'path', None) != path:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS pending ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'client_id TEXT NOT NULL, post_id INTEGER NOT NULL, '
+            'author_id INTEGER NOT NULL, text TEXT NOT NULL)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS pending_author '
+            'ON pending (post_id, author_id)'
+        )
+        _local.conn, _local.path = conn, path
+    return _local.conn
+
+
+def enqueue(post_id, author_id, text):
+    _connection().execute(
+        'INSERT INTO pending (client_id, post_id, author_id, text) '
+        'VALUES (?, ?, ?, ?)',
+        (uuid.uuid4().hex, post_id, author_id, text)
+    )
+
+
+def pending_for(post_id, user):
+    """Комментарии автора к записи, которые ещё ждут в очереди."""
+    if not settings.COMMENT_QUEUE_ENABLED or not user.is_authenticated:
+        return []
+    rows = _connection().execute(
+        'SELECT client_id, text FROM pending '
+        'WHERE post_id = ? AND author_id = ? ORDER BY id',
+        (post_id, user.id)
+    ).fetchall()
+    if not rows:
+        return []
+    # Пачка могла уже попасть в БД, но ещё не уйти из очереди
+    saved = {
+        client_id.hex for client_id in Comment.objects.filter(
+            client_id__in=[client_id for client_id, _ in rows]
+        ).order_by().values_list('client_id', flat=True)
+    }
+    return [text for client_id, text in rows if client_id not in saved]
+
+
+def drain(batch_size=None):
+    """Переносит одну пачку комментариев в БД, возвращает её размер."""
+    conn = _connection()
+    rows = conn.execute(
+        'SELECT id, client_id, post_id, author_id, text FROM pending '
+        'ORDER BY id LIMIT ?',
+        (batch_size or settings.COMMENT_QUEUE_BATCH_SIZE,)
+    ).fetchall()
+    if not rows:
+        return 0
+    with transaction.atomic():
+        # Пост или автор могли быть удалены, пока комментарий лежал
+        # в очереди: такие строки отбрасываются, а не валят всю пачку
+        alive = Post.objects.only('author_id').in_bulk(
+            {post_id for _, _, post_id, _, _ in rows}
+        )
+        authors = set(User.objects.filter(
+            pk__in={author_id for _, _, _, author_id, _ in rows}
+        ).values_list('pk', flat=True))
+        saved = {
+            client_id.hex for client_id in Comment.objects.filter(
+                client_id__in=[client_id for _, client_id, *_ in rows]
+            ).order_by().values_list('client_id', flat=True)
+        }
+        comments = Comment.objects.bulk_create(
+            Comment(
+                post=alive[post_id],
+                author_id=author_id,
+                text=text,
+                client_id=client_id,
+            )
+            for _, client_id, post_id, author_id, text in rows
+            if post_id in alive and author_id in authors
+            and client_id not in saved
+        )
+        notifications.notify_comments(comments)
+    # Очередь чистится только после фиксации: сбой между ними
+    # оставит пачку, и следующий перенос её пропустит
+    conn.execute('DELETE FROM pending WHERE id <= ?', (rows[-1][0],))
+    return len(rows)
+
+
+def size():
+    return _connection().execute(
+        'SELECT COUNT(*) FROM pending'
+    ).fetchone()[0]
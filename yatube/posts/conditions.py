@@ -0,0 +1,70 @@
+"""ETag для лент: одна индексированная выборка вместо рендера страницы.
+
+Токен складывается из последней записи ленты, версии контента
+(растёт при любом изменении или удалении записи, хранится в БД
+и потому общая для всех процессов), номера страницы и состояния
+пользователя, которое видно в шапке.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+
+from . import counters, headers
+from .models import Post
+from .notifications import unread_count
+
+
+def feed_versions(request):
+    """Версии лент (см. counters.versions), одна выборка на запрос."""
+    if not hasattr(request, '_feed_versions'):
+        request._feed_versions = counters.versions()
+    return request._feed_versions
+
+
+def _latest(queryset):
+    return queryset.order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    ).first()
+
+
+def _etag(request, *parts):
+    user = request.user
+    viewer = (
+        f'{user.pk}:{unread_count(user)}' if user.is_authenticated
+        else 'anon'
+    )
+    raw = '|'.join(map(str, (
+        *parts, feed_versions(request)[0], viewer,
+        request.GET.get('page', 1),
+    )))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    # Удаление записи не сбрасывает фрагмент ленты главной, он живёт
+    # INDEX_CACHE_TIMEOUT: токен меняется хотя бы раз за этот срок,
+    # иначе браузер держал бы устаревшую страницу под старым ETag
+    return _etag(
+        request, 'index', _latest(Post.objects),
+        int(time.time() // settings.INDEX_CACHE_TIMEOUT),
+    )
+
+
+def group_etag(request, slug):
+    group = headers.get_group(slug)
+    return _etag(
+        request, 'group', slug,
+        _latest(Post.objects.filter(group_id=group.id))
+    )
+
+
+def profile_etag(request, username):
+    author = headers.get_author(username)
+    return _etag(
+        request, 'profile', username,
+        _latest(Post.objects.filter(author_id=author.id)),
+        request.user.is_authenticated and request.user.follower.filter(
+            author_id=author.id
+        ).exists(),
+    )
@@ -0,0 +1,99 @@
+"""Счётчики записей лент для паджинатора.
+
+Строка счётчика появляется при первом чтении (один COUNT(*)),
+дальше её меняют сигналы сохранения и удаления записей в той же
+транзакции, что и сама запись.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, Subquery, When
+
+from .models import FeedCounter, Group, Post
+
+INDEX = 'index'
+# Версии лент живут в БД, а не в кеше процесса: их видят все воркеры.
+# FEED_VERSION растёт при любом изменении записей (ETag лент, кеш
+# числа записей подписок), INDEX_VERSION — при сохранении записи
+# (ключ кеша фрагмента главной: удаление его не сбрасывает)
+FEED_VERSION = 'version:feed'
+INDEX_VERSION = 'version:index'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def follow_cache_key(user_id, feed_version):
+    # Ленту подписок счётчиком не вести: её число записей кешируется
+    # до любого изменения записей или подписок пользователя
+    return f'posts:follow_count:{user_id}:{feed_version}'
+
+
+def versions():
+    """(FEED_VERSION, INDEX_VERSION) одной выборкой."""
+    rows = dict(FeedCounter.objects.filter(
+        key__in=(FEED_VERSION, INDEX_VERSION)
+    ).values_list('key', 'count'))
+    return rows.get(FEED_VERSION, 0), rows.get(INDEX_VERSION, 0)
+
+
+def bump(*keys):
+    updated = FeedCounter.objects.filter(key__in=keys).update(
+        count=F('count') + 1
+    )
+    if updated < len(keys):
+        # Первая правка после установки: версий ещё нет
+        for key in keys:
+            FeedCounter.objects.get_or_create(key=key, defaults={'count': 1})
+
+
+def keys_for(author_id):
+    return [INDEX, author_key(author_id)]
+
+
+def adjust(keys, delta):
+    # Отсутствующие строки не создаём: их посчитает первое чтение
+    FeedCounter.objects.filter(key__in=keys).update(count=F('count') + delta)
+
+
+def group_post_added(group_id, pub_date):
+    Group.objects.filter(pk=group_id).update(
+        post_count=F('post_count') + 1,
+        last_post_at=Case(
+            When(last_post_at__gte=pub_date, then=F('last_post_at')),
+            default=pub_date
+        )
+    )
+
+
+def group_post_removed(group_id):
+    # Самая свежая запись группы берётся по индексу (group, -pub_date)
+    Group.objects.filter(pk=group_id).update(
+        post_count=F('post_count') - 1,
+        last_post_at=Subquery(
+            Post.objects.filter(group_id=OuterRef('pk'))
+            .order_by('-pub_date').values('pub_date')[:1]
+        )
+    )
+
+
+def group_count(group_id):
+    # Group.post_count ведут те же сигналы, что и строки FeedCounter
+    return Group.objects.filter(pk=group_id).values_list(
+        'post_count', flat=True
+    ).first() or 0
+
+
+def get(key, queryset):
+    count = FeedCounter.objects.filter(key=key).values_list(
+        'count', flat=True
+    ).first()
+    if count is not None:
+        return count
+    count = queryset.count()
+    try:
+        with transaction.atomic():
+            FeedCounter.objects.create(key=key, count=count)
+    except IntegrityError:
+        # Счётчик успел создать параллельный запрос
+        pass
+    return count
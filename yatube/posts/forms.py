@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from django.template.defaultfilters import filesizeformat
 
+from . import images
 from .models import Comment, Post
 
 
@@ -8,6 +13,32 @@ class PostForm(ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Слишком большой файл отброшен ещё при загрузке,
+        # см. posts.uploadhandlers.MaxSizeUploadHandler
+        self.image_oversized = getattr(
+            self.files.get('image'), 'oversized', False
+        )
+        if self.image_oversized:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_oversized:
+            raise ValidationError(
+                'Файл больше %s.'
+                % filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)
+            )
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.instance.image_width = self.instance.image_height = None
+        if not isinstance(image, UploadedFile):
+            return image
+        processed, width, height = images.process(image)
+        self.instance.image_width, self.instance.image_height = width, height
+        return processed or image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,71 @@
+"""Фрагменты лент и комментариев для бесконечной прокрутки.
+
+Вместо полной страницы отдаётся только цикл записей после курсора,
+а курсор следующего фрагмента приходит в заголовке X-Next-Cursor.
+Курсор — это время и id последнего показанного элемента, поэтому
+выборка идёт по индексу, а не через OFFSET.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+from django.shortcuts import render
+
+CURSOR = re.compile(r'^(\d+)\.(\d+)$')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def make_cursor(obj, field):
+    return _encode(getattr(obj, field), obj.pk)
+
+
+def _encode(moment, pk):
+    return f'{(moment - EPOCH) // MICROSECOND}.{pk}'
+
+
+def last_cursor(queryset, field):
+    """Курсор после последнего элемента выборки.
+
+    Читаются только поле курсора и id, сами элементы не загружаются.
+    """
+    rows = list(queryset.values_list(field, 'pk'))
+    return _encode(*rows[-1]) if rows else None
+
+
+def after_cursor(queryset, cursor, field):
+    match = CURSOR.match(cursor or '')
+    if match is None:
+        return queryset
+    moment = EPOCH + int(match.group(1)) * MICROSECOND
+    return queryset.filter(
+        Q(**{f'{field}__lt': moment})
+        | Q(**{field: moment, 'pk__lt': int(match.group(2))})
+    )
+
+
+def take(queryset, cursor, field, size):
+    """Элементы после курсора и курсор следующей порции (или None)."""
+    items = list(
+        after_cursor(queryset, cursor, field)
+        .order_by(f'-{field}', '-pk')[:size + 1]
+    )
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    return items, make_cursor(items[-1], field)
+
+
+def render_fragment(request, template_name, queryset, field, size,
+                    context=None, prepare=None):
+    items, cursor = take(
+        queryset, request.GET.get('cursor'), field, size
+    )
+    if prepare is not None:
+        items = prepare(items)
+    response = render(
+        request, template_name, {**(context or {}), 'items': items}
+    )
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+    return response
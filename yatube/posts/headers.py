@@ -0,0 +1,86 @@
+"""Кеш шапок страниц группы и профиля.
+
+По id группы или автора в кеше лежат только поля шапки, а slug
+или username (в виде хеша: в ключах не должно быть кириллицы) ведёт
+к id. На тёплом пути страница не ищет группу или автора по имени.
+Числа записей здесь нет: оно меняется с каждой записью, а кеш
+у каждого процесса свой, поэтому паджинатор читает его из БД
+(см. counters.group_count и счётчик автора).
+Сигналы сохранения групп и пользователей после фиксации транзакции
+сбрасывают шапку по id, без запросов к БД.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+
+from .models import Group
+
+User = get_user_model()
+
+GROUP_KEY = 'posts:group_header:{}'
+GROUP_SLUG_KEY = 'posts:group_slug:{}'
+AUTHOR_KEY = 'posts:author_header:{}'
+AUTHOR_NAME_KEY = 'posts:author_name:{}'
+GROUP_FIELDS = ('id', 'slug', 'title', 'description')
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+
+def _from_values(model, fields, values):
+    # from_db ждёт значения в порядке полей модели
+    row = dict(zip(fields, values))
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in row
+    ]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, names, [row[name] for name in names]
+    )
+
+
+def _read_through(name_key, key, name, load):
+    """Поля по имени: values[0] — id, values[1] — само имя."""
+    name_key = name_key.format(hashlib.md5(name.encode()).hexdigest())
+    pk = cache.get(name_key)
+    values = None if pk is None else cache.get(key.format(pk))
+    # Имя могло перейти к другой записи, пока ссылка жила в кеше
+    if values is None or values[1] != name:
+        values = load()
+        if values is None:
+            raise Http404
+        cache.set_many(
+            {name_key: values[0], key.format(values[0]): values},
+            settings.HEADER_CACHE_TIMEOUT
+        )
+    return values
+
+
+def get_group(slug):
+    values = _read_through(
+        GROUP_SLUG_KEY, GROUP_KEY, slug,
+        lambda: Group.objects.filter(slug=slug).values_list(
+            *GROUP_FIELDS
+        ).first()
+    )
+    return _from_values(Group, GROUP_FIELDS, values)
+
+
+def get_author(username):
+    """Автор — неполный объект User с полями шапки."""
+    values = _read_through(
+        AUTHOR_NAME_KEY, AUTHOR_KEY, username,
+        lambda: User.objects.filter(username=username).values_list(
+            *AUTHOR_FIELDS
+        ).first()
+    )
+    return _from_values(User, AUTHOR_FIELDS, values)
+
+
+def forget(author_ids=(), group_ids=()):
+    # До фиксации читатель успел бы закешировать старые значения заново
+    keys = [AUTHOR_KEY.format(pk) for pk in author_ids if pk]
+    keys += [GROUP_KEY.format(pk) for pk in group_ids if pk]
+    transaction.on_commit(lambda: cache.delete_many(keys))
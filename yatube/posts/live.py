@@ -0,0 +1,176 @@
+"""Живая лента: id новых записей через Server-Sent Events.
+
+Сохранение поста публикует его id в канал общей ленты, группы
+и автора; открытые соединения подписаны на нужные каналы. Шина
+живёт в процессе и не трогает БД, поэтому простаивающее
+соединение ничего не стоит, кроме записи в словаре подписок.
+Под ASGI (yatube.asgi) поток отдаётся асинхронно и не занимает
+поток пула; под WSGI каждое соединение держит поток сервера,
+поэтому живая лента включается только настройкой LIVE_FEED_ENABLED,
+а число подписчиков процесса ограничено LIVE_MAX_SUBSCRIBERS.
+"""
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+
+INDEX = 'index'
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+class Subscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.messages = deque(maxlen=settings.LIVE_BUFFER_SIZE)
+        self.ready = threading.Event()
+        self.loop = self.async_ready = None
+
+    def put(self, message):
+        self.messages.append(message)
+        self.ready.set()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.async_ready.set)
+
+    def drain(self):
+        messages = []
+        while self.messages:
+            messages.append(self.messages.popleft())
+        return messages
+
+    def get(self, timeout):
+        if not self.messages:
+            self.ready.wait(timeout)
+        self.ready.clear()
+        return self.drain()
+
+    async def aget(self, timeout):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.async_ready = asyncio.Event()
+        if not self.messages:
+            try:
+                await asyncio.wait_for(self.async_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.async_ready.clear()
+        return self.drain()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.subscriptions = set()
+
+    def subscribe(self, channels):
+        """Подписка на каналы или None, если мест больше нет."""
+        subscription = Subscription(self, channels)
+        with self.lock:
+            if len(self.subscriptions) >= settings.LIVE_MAX_SUBSCRIBERS:
+                return None
+            self.subscriptions.add(subscription)
+            for channel in channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    def publish(self, channels, message):
+        with self.lock:
+            # Подписчик на несколько каналов получает сообщение один раз
+            subscribers = set().union(
+                *(self.channels.get(channel, ()) for channel in channels)
+            )
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+broker = Broker()
+
+
+def publish_post(post):
+    channels = [INDEX, author_channel(post.author_id)]
+    if post.group_id:
+        channels.append(group_channel(post.group_id))
+    broker.publish(channels, post.pk)
+
+
+def event(post_id):
+    return f'id: {post_id}\nevent: post\ndata: {post_id}\n\n'.encode()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """Поток событий для подписки; backlog уходит первым."""
+
+    def __init__(self, subscription, backlog=()):
+        self.subscription = subscription
+        self.backlog = list(backlog)
+        super().__init__(self.events(), content_type='text/event-stream')
+        self['Cache-Control'] = 'no-cache'
+        # Запрещаем буферизацию ответа в nginx
+        self['X-Accel-Buffering'] = 'no'
+        self.async_streaming_content = self.async_events()
+
+    def preamble(self):
+        chunks = [f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()]
+        return chunks + [event(post_id) for post_id in self.backlog]
+
+    def events(self):
+        yield b''.join(self.preamble())
+        while True:
+            messages = self.subscription.get(settings.LIVE_HEARTBEAT)
+            yield b''.join(map(event, messages)) or b': ping\n\n'
+
+    async def async_events(self):
+        yield b''.join(self.preamble())
+        while True:
+            messages = await self.subscription.aget(settings.LIVE_HEARTBEAT)
+            yield b''.join(map(event, messages)) or b': ping\n\n'
+
+    def close(self):
+        self.subscription.close()
+        super().close()
+
+
+def stream(request, channels, queryset):
+    """Подписывает соединение на каналы.
+
+    После переподключения браузер присылает Last-Event-ID: записи
+    новее него, пропущенные за время разрыва, берутся из queryset.
+    """
+    if not settings.LIVE_FEED_ENABLED:
+        raise Http404
+    subscription = broker.subscribe(channels)
+    if subscription is None:
+        # Браузер не переподключается после ошибки: нагрузка спадёт
+        response = HttpResponse(status=503)
+        response['Retry-After'] = str(settings.LIVE_RETRY_MS // 1000)
+        return response
+    last_id = request.META.get('HTTP_LAST_EVENT_ID', '')
+    backlog = []
+    if last_id.isdigit():
+        backlog = queryset.filter(pk__gt=int(last_id)).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:settings.LIVE_BUFFER_SIZE]
+    return EventStreamResponse(subscription, backlog)
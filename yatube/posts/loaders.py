@@ -0,0 +1,98 @@
+"""Пакетная подгрузка связей для лент.
+
+Страница ленты выбирается одним запросом без JOIN, затем авторы,
+группы и счётчики комментариев подгружаются по одному запросу
+на тип для всех записей страницы сразу. Шаблоны получают готовые
+объекты; в строгом режиме (DATALOADER_STRICT) любой другой запрос
+во время рендера ленты — ошибка.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+
+from .models import Comment, Group
+
+User = get_user_model()
+
+_state = threading.local()
+
+
+class LazyQueryError(RuntimeError):
+    pass
+
+
+def _block_lazy_queries(execute, sql, params, many, context):
+    if getattr(_state, 'loading', False):
+        return execute(sql, params, many, context)
+    raise LazyQueryError(f'Ленивый запрос во время рендера: {sql}')
+
+
+@contextmanager
+def strict():
+    if not settings.DATALOADER_STRICT:
+        yield
+        return
+    with connection.execute_wrapper(_block_lazy_queries):
+        yield
+
+
+@contextmanager
+def loading():
+    previous = getattr(_state, 'loading', False)
+    _state.loading = True
+    try:
+        yield
+    finally:
+        _state.loading = previous
+
+
+def hydrate(posts):
+    """Подгружает связи записей пачками и возвращает их списком."""
+    with loading():
+        posts = list(posts)
+        if not posts:
+            return posts
+        authors = User.objects.in_bulk({post.author_id for post in posts})
+        groups = Group.objects.in_bulk(
+            {post.group_id for post in posts if post.group_id}
+        )
+        counts = dict(
+            Comment.objects.filter(post__in=[post.pk for post in posts])
+            .order_by().values('post').annotate(count=Count('id'))
+            .values_list('post', 'count')
+        )
+    for post in posts:
+        post.author = authors[post.author_id]
+        post.group = groups.get(post.group_id)
+        post.comment_count = counts.get(post.pk, 0)
+    return posts
+
+
+class PostLoader:
+    """Записи страницы, которые выбираются при первом обращении.
+
+    Пока шаблон не перебирает записи (например, лента взята из кеша
+    фрагмента), запросов нет вовсе.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.items = None
+
+    def load(self):
+        if self.items is None:
+            self.items = hydrate(self.queryset)
+        return self.items
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __getitem__(self, index):
+        return self.load()[index]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import archive
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Переносит старые записи с комментариями в архивные таблицы '
+            'пачками, каждая в своей транзакции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=None,
+            help='Возраст записей в месяцах (ARCHIVE_AFTER_MONTHS).'
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        months = options['months'] or settings.ARCHIVE_AFTER_MONTHS
+        batch_size = options['batch_size'] or settings.ARCHIVE_BATCH_SIZE
+        before = archive.months_ago(months)
+        if options['dry_run']:
+            count = Post.all_objects.filter(pub_date__lt=before).count()
+            self.stdout.write(f'Записей к переносу: {count}')
+            return
+        total = 0
+        while True:
+            moved = archive.archive_batch(before, batch_size)
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'Перенесено записей: {total}')
+        self.stdout.write(f'Готово, в архиве: {total}')
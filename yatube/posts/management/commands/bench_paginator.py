@@ -0,0 +1,35 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+
+from posts.pagination import CountedPaginator
+
+
+class Command(BaseCommand):
+    help = ('Замеряет рендер posts/includes/paginator.html '
+            'при разном общем числе страниц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', default='10,1000,100000',
+            help='Общее число страниц через запятую.'
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        template = get_template('posts/includes/paginator.html')
+        self.stdout.write(f'{"страниц":>10}{"мкс/рендер":>14}{"байт":>10}')
+        for pages in map(int, options['pages'].split(',')):
+            paginator = CountedPaginator(
+                range(pages * 10), 10, max_pages=pages
+            )
+            context = {'page_obj': paginator.page(pages // 2 or 1)}
+            html = template.render(context)
+            seconds = timeit.timeit(
+                lambda: template.render(context), number=options['repeat']
+            )
+            self.stdout.write(
+                f'{pages:>10}{seconds / options["repeat"] * 1e6:>14.1f}'
+                f'{len(html.encode()):>10}'
+            )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import comment_queue
+
+
+class Command(BaseCommand):
+    help = 'Переносит комментарии из очереди в базу данных пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, опрашивая очередь.'
+        )
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                drained = comment_queue.drain(options['batch_size'])
+                if not drained:
+                    break
+                total += drained
+            if total:
+                self.stdout.write(f'Сохранено комментариев: {total}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
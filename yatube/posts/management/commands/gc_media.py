@@ -0,0 +1,138 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from posts.models import ArchivedPost, Post
+
+
+def walk(root):
+    """Обходит дерево через os.scandir, не собирая списки каталогов."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов, на которые не ссылается ни один '
+            'пост, вместе с их миниатюрами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе N секунд: их пост мог ещё '
+                 'не сохраниться.'
+        )
+        parser.add_argument(
+            '--thumbnails', action='store_true',
+            help='Также удалить миниатюры, неизвестные sorl.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.started = time.monotonic()
+        self.scanned = self.deleted = self.freed = 0
+        # Картинки удалённых и архивных записей тоже считаются занятыми
+        referenced = set()
+        for queryset in (Post.all_objects, ArchivedPost.objects):
+            referenced.update(
+                queryset.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True).iterator(chunk_size=10000)
+            )
+        self.stdout.write(f'Картинок в БД: {len(referenced)}')
+        upload_dir = Post._meta.get_field('image').upload_to
+        self.sweep(upload_dir, referenced, self.delete_sources)
+        if options['thumbnails']:
+            known = self.known_images()
+            self.sweep(thumbnail_settings.THUMBNAIL_PREFIX, known,
+                       self.delete_files)
+        self.report(final=True)
+
+    def known_images(self):
+        """Файлы, о которых знает sorl, после чистки его хранилища.
+
+        Записи sorl читаются из его таблицы (kvstore cached_db,
+        THUMBNAIL_KVSTORE по умолчанию). В режиме dry-run записи
+        о пропавших файлах не удаляются, а только перечисляются.
+        """
+        if not self.options['dry_run']:
+            default.kvstore.cleanup()
+        images = [
+            deserialize_image_file(value) for value in
+            KVStore.objects.filter(
+                key__startswith=add_prefix('', 'image')
+            ).values_list('value', flat=True).iterator()
+        ]
+        if self.options['dry_run']:
+            for image in images:
+                if not image.exists():
+                    self.stdout.write(
+                        f'будет удалена запись sorl {image.name}'
+                    )
+        return {image.name for image in images}
+
+    def sweep(self, directory, keep, delete):
+        cutoff = time.time() - self.options['min_age']
+        batch = []
+        for entry in walk(os.path.join(settings.MEDIA_ROOT, directory)):
+            self.scanned += 1
+            name = os.path.relpath(
+                entry.path, settings.MEDIA_ROOT
+            ).replace(os.sep, '/')
+            stat = entry.stat(follow_symlinks=False)
+            if name in keep or stat.st_mtime > cutoff:
+                continue
+            batch.append((name, entry.path, stat.st_size))
+            if len(batch) >= self.options['batch_size']:
+                delete(batch)
+                batch = []
+                self.report()
+        if batch:
+            delete(batch)
+
+    def delete_sources(self, batch):
+        if not self.options['dry_run']:
+            for name, path, size in batch:
+                # Вместе с записями sorl удаляются и миниатюры источника
+                default.kvstore.delete(ImageFile(name, default_storage))
+        self.delete_files(batch)
+
+    def delete_files(self, batch):
+        for name, path, size in batch:
+            if self.options['dry_run']:
+                self.stdout.write(f'будет удалён {name}')
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            self.deleted += 1
+            self.freed += size
+
+    def report(self, final=False):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        prefix = 'Итого' if final else 'Прогресс'
+        verb = 'к удалению' if self.options['dry_run'] else 'удалено'
+        self.stdout.write(
+            f'{prefix}: просмотрено {self.scanned} файлов '
+            f'({self.scanned / elapsed:.0f}/с), {verb} {self.deleted}, '
+            f'{self.freed / 1024 / 1024:.1f} МБ'
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Рассылает письма-дайджесты с непрочитанными уведомлениями.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Отправлено писем: {send_digests()}')
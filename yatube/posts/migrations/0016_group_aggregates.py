@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:49
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_aggregates(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    aggregates = Post.objects.filter(group__isnull=False).order_by().values(
+        'group'
+    ).annotate(count=Count('id'), last=Max('pub_date'))
+    for row in aggregates:
+        Group.objects.filter(pk=row['group']).update(
+            post_count=row['count'], last_post_at=row['last']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feedcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_post_at'], name='posts_group_last_po_a493fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-post_count'], name='posts_group_post_co_d99cf9_idx'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
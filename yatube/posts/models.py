@@ -8,11 +8,30 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Ведутся сигналами записей (posts.counters), чтобы каталог групп
+    # не делал GROUP BY по всем записям
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    last_post_at = models.DateTimeField(
+        blank=True, null=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_post_at']),
+            models.Index(fields=['-post_count']),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class LivePostManager(models.Manager):
+    """Записи без удалённых: по ним строятся все ленты."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст сообщения',
@@ -38,11 +57,125 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
         null=True,
+        db_index=True,
         help_text='Выберите картинку'
     )
+    # Размеры сохраняются при загрузке, чтобы не открывать файл
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
+    )
+    # Мягкое удаление: запись пропадает из лент, но остаётся в базе
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    objects = LivePostManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # Индексы лент частичные: удалённые строки в них не попадают
+        indexes = [
+            models.Index(
+                fields=['-pub_date'], name='post_live_pub_date',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_live_group_pub_date',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_live_author_pub_date',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class Revision(models.Model):
+    """Прежняя версия текста записи (posts.revisions).
+
+    Хранится не текст, а сжатая разница с последующей версией,
+    поэтому размер растёт с объёмом правки, а не длиной записи.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='revisions'
+    )
+    number = models.PositiveIntegerField()
+    # Момент правки, заменившей эту версию
+    created = models.DateTimeField(auto_now_add=True)
+    delta = models.BinaryField()
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_post_revision',
+                fields=['post', 'number'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} #{self.number}'
+
+
+class ArchivedPost(models.Model):
+    """Старая запись, перенесённая из ленты командой archive_posts.
+
+    id совпадает с id исходной записи, поэтому прежние ссылки
+    на запись продолжают работать (posts.archive).
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image_width = models.PositiveIntegerField(blank=True, null=True)
+    image_height = models.PositiveIntegerField(blank=True, null=True)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField()
+    created = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created']
 
     def __str__(self):
         return self.text[:15]
@@ -67,6 +200,14 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    # Ключ из очереди комментариев: повторный перенос пачки
+    # не создаёт дублей
+    client_id = models.UUIDField(
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-created']
@@ -94,3 +235,51 @@ class Follow(models.Model):
                 check=~models.Q(user=models.F('author')),
             ),
         ]
+
+
+class Notification(models.Model):
+    NEW_POST = 'post'
+    NEW_COMMENT = 'comment'
+    KINDS = (
+        (NEW_POST, 'Новая запись'),
+        (NEW_COMMENT, 'Новый комментарий'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    created = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+    emailed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+            models.Index(fields=['emailed', 'is_read']),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.post}'
+
+
+class FeedCounter(models.Model):
+    """Число записей ленты; обновляется сигналами вместо COUNT(*)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.key}: {self.count}'
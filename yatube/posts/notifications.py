@@ -0,0 +1,131 @@
+"""Уведомления подписчиков о новых записях и комментариях.
+
+Уведомления пишутся пачками через ``bulk_create``, счётчик
+непрочитанных кешируется для каждого пользователя, а письма-дайджесты
+отправляет команда ``send_digests`` одним соединением.
+"""
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+from .models import Follow, Notification
+
+UNREAD_KEY = 'notifications:unread:{user_id}'
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _reset_unread(user_ids):
+    cache.delete_many([UNREAD_KEY.format(user_id=pk) for pk in user_ids])
+
+
+def unread_count(user):
+    key = UNREAD_KEY.format(user_id=user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = user.notifications.filter(is_read=False).count()
+        cache.set(key, count, settings.NOTIFICATIONS_UNREAD_TTL)
+    return count
+
+
+def notify_followers(post):
+    # Все пачки в одной транзакции: повтор упавшей задачи
+    # не продублирует уведомления уже записанных пачек
+    notified = []
+    with transaction.atomic():
+        followers = Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True).iterator()
+        for batch in _batches(followers, settings.NOTIFICATIONS_BATCH_SIZE):
+            Notification.objects.bulk_create(
+                Notification(
+                    user_id=user_id,
+                    actor_id=post.author_id,
+                    post=post,
+                    kind=Notification.NEW_POST
+                )
+                for user_id in batch
+            )
+            notified += batch
+    _reset_unread(notified)
+
+
+def notify_comments(comments):
+    """Уведомляет авторов записей о комментариях к ним одной пачкой."""
+    notifications = [
+        Notification(
+            user_id=comment.post.author_id,
+            actor_id=comment.author_id,
+            post_id=comment.post_id,
+            kind=Notification.NEW_COMMENT
+        )
+        for comment in comments
+        if comment.author_id != comment.post.author_id
+    ]
+    Notification.objects.bulk_create(
+        notifications, batch_size=settings.NOTIFICATIONS_BATCH_SIZE
+    )
+    _reset_unread({item.user_id for item in notifications})
+
+
+def mark_read(user, notifications):
+    updated = user.notifications.filter(
+        pk__in=[item.pk for item in notifications], is_read=False
+    ).update(is_read=True)
+    if updated:
+        _reset_unread([user.pk])
+
+
+def _digest(user, notifications):
+    lines = [
+        f'{item.actor.username}: {item.get_kind_display().lower()} '
+        f'«{item.post}» {settings.SITE_URL}'
+        f'{reverse("posts:post_detail", args=[item.post_id])}'
+        for item in notifications
+    ]
+    return mail.EmailMessage(
+        subject=f'Yatube: непрочитанных уведомлений — {len(lines)}',
+        body='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def send_digests():
+    """Отправляет по письму на пользователя, возвращает число писем."""
+    pending = Notification.objects.filter(
+        emailed=False, is_read=False
+    ).exclude(user__email='').select_related(
+        'user', 'actor', 'post'
+    ).order_by('user_id', '-created')
+    connection = mail.get_connection()
+    sent, messages, ids = 0, [], []
+    for user, notifications in groupby(
+        pending, key=lambda item: item.user
+    ):
+        notifications = list(notifications)
+        messages.append(_digest(user, notifications))
+        ids.extend(item.pk for item in notifications)
+        if len(messages) >= settings.NOTIFICATIONS_BATCH_SIZE:
+            sent += _flush(connection, messages, ids)
+            messages, ids = [], []
+    return sent + _flush(connection, messages, ids)
+
+
+def _flush(connection, messages, ids):
+    if not messages:
+        return 0
+    sent = connection.send_messages(messages) or 0
+    Notification.objects.filter(pk__in=ids).update(emailed=True)
+    return sent
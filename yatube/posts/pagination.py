@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from . import counters
+
+
+class CountedPaginator(Paginator):
+    """Паджинатор без COUNT(*) на каждый просмотр.
+
+    counter — ключ счётчика posts.counters, который ведут сигналы;
+    cache_key — для лент без счётчика (подписки): число записей
+    кешируется на PAGINATOR_COUNT_TIMEOUT секунд; count — число,
+    уже известное заранее (Group.post_count). Число страниц
+    ограничено max_pages (PAGINATOR_MAX_PAGES): дальше лента
+    листается курсором, а не OFFSET.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, counter=None, cache_key=None,
+                 max_pages=None, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+        self.counter = counter
+        self.cache_key = cache_key
+        self.max_pages = max_pages or settings.PAGINATOR_MAX_PAGES
+
+    def exact_count(self):
+        return Paginator.count.func(self)
+
+    @cached_property
+    def count(self):
+        if self.counter is not None:
+            return counters.get(self.counter, self.object_list)
+        if self.cache_key is not None:
+            return cache.get_or_set(
+                self.cache_key, self.exact_count,
+                settings.PAGINATOR_COUNT_TIMEOUT
+            )
+        return self.exact_count()
+
+    @cached_property
+    def num_pages(self):
+        return min(Paginator.num_pages.func(self), self.max_pages)
+
+    @cached_property
+    def truncated(self):
+        """Записей больше, чем покрывают страницы до max_pages."""
+        return self.count > self.num_pages * self.per_page
+
+    def _get_page(self, object_list, number, paginator):
+        page = super()._get_page(object_list, number, paginator)
+        # Навигация получает несколько номеров страниц вместо всех
+        page.page_links = list(self.elided_page_range(number))
+        return page
+
+    def elided_page_range(self, number, on_each_side=2, on_ends=1):
+        """Первые, последние и соседние с текущей страницы с пропусками."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2 + 1:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
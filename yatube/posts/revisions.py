@@ -0,0 +1,122 @@
+"""История правок записей в виде сжатых разниц.
+
+При правке в Revision сохраняется разница, которая превращает
+новый текст обратно в прежний: ссылки на отрезки нового текста
+(по словам) и вставки. Текущий текст лежит в Post.text, любая
+прежняя версия восстанавливается применением разниц сверху вниз.
+Восстановленные тексты кешируются, поэтому повторный просмотр
+и соседние страницы истории начинают с ближайшей готовой версии.
+"""
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from .models import Post, Revision
+
+# Слово вместе с пробелами после него: отдельные пробелы повторялись
+# бы тысячи раз, и сравнение становилось бы квадратичным
+TOKENS = re.compile(r'\s+|(?:\w+|[^\w\s]+)\s*')
+TEXT_KEY = 'posts:revision_text:{}'
+RECORD_ATTEMPTS = 3
+
+
+def make_delta(source, target):
+    """Сжатая разница, которая строит target из отрезков source."""
+    old, new = TOKENS.findall(source), TOKENS.findall(target)
+    ops = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j1 < j2:
+            ops.append(''.join(new[j1:j2]))
+    return zlib.compress(
+        json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode()
+    )
+
+
+def apply_delta(source, delta):
+    tokens = TOKENS.findall(source)
+    return ''.join(
+        op if isinstance(op, str) else ''.join(tokens[op[0]:op[1]])
+        for op in json.loads(zlib.decompress(delta))
+    )
+
+
+def replaced_text(post):
+    """Текст записи в БД, который заменит сохранение post.
+
+    В транзакции строка блокируется до UPDATE: разница строится
+    от текста, который действительно заменяется, даже если после
+    загрузки post его успела поменять параллельная правка.
+    """
+    queryset = Post.all_objects.filter(pk=post.pk)
+    if transaction.get_connection().in_atomic_block:
+        queryset = queryset.select_for_update()
+    return queryset.values_list('text', flat=True).first()
+
+
+def record(post, old_text):
+    delta = make_delta(post.text, old_text)
+    for attempt in range(RECORD_ATTEMPTS):
+        last = post.revisions.aggregate(last=Max('number'))['last'] or 0
+        try:
+            with transaction.atomic():
+                return Revision.objects.create(
+                    post=post, number=last + 1, delta=delta
+                )
+        except IntegrityError:
+            # Номер успела занять параллельная правка: берём следующий
+            if attempt == RECORD_ATTEMPTS - 1:
+                raise
+
+
+def texts(post, low):
+    """Тексты версий записи с номером от low по номерам версий."""
+    keys = dict(
+        post.revisions.filter(number__gte=low).values_list('number', 'pk')
+    )
+    keys = {number: TEXT_KEY.format(pk) for number, pk in keys.items()}
+    cached = cache.get_many(keys.values())
+    result = {
+        number: cached[key] for number, key in keys.items() if key in cached
+    }
+    missing = [number for number in keys if number not in result]
+    if not missing:
+        return result
+    deltas = dict(
+        post.revisions.filter(number__in=missing)
+        .values_list('number', 'delta')
+    )
+    # Начинаем с ближайшей готовой версии над самой новой недостающей
+    top = max(missing)
+    text = result.get(top + 1, post.text)
+    fresh = {}
+    for number in sorted(keys, reverse=True):
+        if number > top:
+            continue
+        if number in result:
+            text = result[number]
+            continue
+        text = apply_delta(text, deltas[number])
+        result[number] = text
+        fresh[keys[number]] = text
+    cache.set_many(fresh, settings.REVISION_CACHE_TIMEOUT)
+    return result
+
+
+def attach_texts(post, revisions):
+    """Проставляет версиям из revisions восстановленный текст."""
+    revisions = list(revisions)
+    if not revisions:
+        return revisions
+    found = texts(post, min(revision.number for revision in revisions))
+    for revision in revisions:
+        revision.text = found[revision.number]
+    return revisions
@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from . import counters, headers, live, revisions
+from .models import ArchivedPost, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _referenced(name):
+    return (Post.all_objects.filter(image=name).exists()
+            or ArchivedPost.objects.filter(image=name).exists())
+
+
+def release_image(name):
+    """Удаляет файл и его миниатюры, если на него больше нет ссылок.
+
+    Файл моложе IMAGE_RELEASE_MIN_AGE секунд остаётся: его дубль могла
+    только что получить загрузка, чей пост ещё не сохранён
+    (posts.storage). Такие файлы позже соберёт gc_media.
+    """
+    if not name or _referenced(name):
+        return
+    try:
+        if not default_storage.exists(name):
+            return
+        age = timezone.now() - default_storage.get_modified_time(name)
+        if age.total_seconds() < settings.IMAGE_RELEASE_MIN_AGE:
+            return
+        # Ссылки проверяются ещё раз прямо перед удалением
+        if _referenced(name):
+            return
+        default.kvstore.delete(ImageFile(name, default_storage))
+        default_storage.delete(name)
+    except SuspiciousFileOperation:
+        # Путь вне MEDIA_ROOT: такой файл хранилищу не принадлежит
+        pass
+
+
+def _image_name(instance):
+    # Читаем сырое значение: обращение к отложенному полю image
+    # стоило бы отдельного запроса
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._loaded_image = _image_name(instance)
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, **kwargs):
+    old, new = instance._loaded_image, _image_name(instance)
+    if not created and old and old != new:
+        transaction.on_commit(lambda: release_image(old))
+    instance._loaded_image = new
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(pre_save, sender=Post)
+def read_replaced_text(sender, instance, update_fields=None, **kwargs):
+    # Прежний текст берётся из БД, а не из загруженного экземпляра
+    instance._replaced_text = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    instance._replaced_text = revisions.replaced_text(instance)
+
+
+@receiver(post_save, sender=Post)
+def record_revision(sender, instance, created, **kwargs):
+    old = instance._replaced_text
+    if not created and old is not None and old != instance.text:
+        revisions.record(instance, old)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    old_group_id, instance._loaded_group_id = (
+        instance._loaded_group_id, instance.group_id
+    )
+    # Уже удалённую запись счётчики не учитывают: перенос её в другую
+    # группу (например, из админки) их не меняет
+    if instance._loaded_deleted_at is not None:
+        return
+    if created:
+        counters.adjust(counters.keys_for(instance.author_id), 1)
+    elif old_group_id == instance.group_id:
+        return
+    elif old_group_id:
+        counters.group_post_removed(old_group_id)
+    if instance.group_id:
+        counters.group_post_added(instance.group_id, instance.pub_date)
+
+
+def uncount_post(instance):
+    counters.adjust(counters.keys_for(instance.author_id), -1)
+    if instance.group_id:
+        counters.group_post_removed(instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    # Мягко удалённую запись счётчики уже не учитывают
+    if instance.deleted_at is None:
+        uncount_post(instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_deleted(sender, instance, **kwargs):
+    instance._loaded_deleted_at = instance.__dict__.get('deleted_at')
+
+
+@receiver(post_save, sender=Post)
+def count_soft_deleted_post(sender, instance, created, **kwargs):
+    was_deleted = instance._loaded_deleted_at is not None
+    instance._loaded_deleted_at = instance.deleted_at
+    if not created and not was_deleted and instance.deleted_at is not None:
+        uncount_post(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group_header(sender, instance, **kwargs):
+    headers.forget(group_ids=[instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_author_header(sender, instance, **kwargs):
+    headers.forget(author_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follow_count(sender, instance, **kwargs):
+    feed_version, _ = counters.versions()
+    cache.delete(counters.follow_cache_key(instance.user_id, feed_version))
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: live.publish_post(instance))
+
+
+@receiver(post_save, sender=Post)
+def change_feed_version(sender, **kwargs):
+    # Новая или изменённая запись сдвигает все страницы главной
+    counters.bump(counters.FEED_VERSION, counters.INDEX_VERSION)
+
+
+@receiver(post_delete, sender=Post)
+def change_feed_version_on_delete(sender, **kwargs):
+    # Удаление кеш главной не сбрасывает: лента догонит его по таймауту
+    counters.bump(counters.FEED_VERSION)
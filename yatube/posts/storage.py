@@ -0,0 +1,54 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from core.storage import InMemoryStorage
+
+
+class ContentAddressedMixin:
+    """Имена файлов по SHA-256 содержимого.
+
+    Одинаковые картинки хранятся одним файлом
+    ``<каталог>/<2 символа хеша>/<хеш>.<расширение>``, поэтому
+    у них общие и миниатюры sorl. Файл удаляется, когда на него
+    не ссылается ни один пост, см. ``posts.signals``.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        name = posixpath.join(
+            posixpath.dirname(name),
+            digest[:2],
+            digest + os.path.splitext(name)[1].lower()
+        )
+        if self.exists(name):
+            # Свежая отметка времени защищает файл от release_image
+            # и gc_media, пока пост с ним ещё не сохранён
+            self.touch(name)
+            return name
+        return super().save(name, content, max_length)
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    def touch(self, name):
+        os.utime(self.path(name))
+
+
+class InMemoryContentAddressedStorage(ContentAddressedMixin,
+                                      InMemoryStorage):
+    """То же в памяти процесса: для тестов."""
+
+    def touch(self, name):
+        self.files[name] = (self.files[name][0], timezone.now())
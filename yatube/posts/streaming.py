@@ -0,0 +1,42 @@
+"""Потоковый рендер длинных страниц (включается STREAMING_RENDER).
+
+Страница рендерится без списка записей или комментариев: вместо
+цикла шаблон выводит маркер. Всё до маркера (head, шапка) уходит
+клиенту первым куском, затем по куску на каждый элемент списка,
+затем хвост страницы.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template import loader
+from django.template.context import make_context
+from django.utils.safestring import mark_safe
+
+from . import loaders
+
+STREAM_MARKER = mark_safe('<!-- stream -->')
+
+
+def stream_render(request, template_name, context, items, item_template,
+                  item_name, separator=''):
+    if not settings.STREAMING_RENDER:
+        return render(request, template_name, context)
+    page = loader.render_to_string(
+        template_name, {**context, 'stream_marker': STREAM_MARKER}, request
+    )
+    head, tail = page.split(STREAM_MARKER, 1)
+    template = loader.get_template(item_template).template
+
+    def chunks():
+        yield head
+        # Контекст и процессоры контекста собираются один раз на страницу
+        item_context = make_context(context, request)
+        with item_context.bind_template(template):
+            for number, item in enumerate(items):
+                with item_context.push({item_name: item}), loaders.strict():
+                    yield (separator if number else '') + template.render(
+                        item_context
+                    )
+        yield tail
+
+    return StreamingHttpResponse(chunks())
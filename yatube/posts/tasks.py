@@ -0,0 +1,22 @@
+from core.tasks import task
+
+from . import images, notifications
+from .models import Post
+
+
+@task('posts.post_saved')
+def post_saved(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    if post.image:
+        # Готовим варианты заранее, чтобы их не строил первый читатель
+        images.variants(post.image, post.image_width)
+        images.placeholder(post.image)
+
+
+@task('posts.notify_followers')
+def notify_followers(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        notifications.notify_followers(post)
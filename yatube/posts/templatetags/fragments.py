@@ -0,0 +1,16 @@
+from django import template
+from django.urls import reverse
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/more.html')
+def more_posts(page, viewname, *args):
+    """Подгрузка следующих записей ленты после текущей страницы."""
+    # Курсор готовит feed_page, не трогая записи страницы
+    if not page.next_cursor:
+        return {}
+    return {
+        'url': reverse(viewname, args=args),
+        'cursor': page.next_cursor,
+    }
@@ -0,0 +1,24 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from posts.models import Group
+
+register = template.Library()
+
+TOP_GROUPS_KEY = 'posts:top_groups'
+
+
+@register.simple_tag
+def top_groups():
+    """Самые большие группы; кешируется готовый HTML блока."""
+    html = cache.get(TOP_GROUPS_KEY)
+    if html is None:
+        html = render_to_string('posts/includes/top_groups.html', {
+            'groups': Group.objects.order_by('-post_count', '-pk')[
+                :settings.TOP_GROUPS_SIZE
+            ],
+        })
+        cache.set(TOP_GROUPS_KEY, html, settings.TOP_GROUPS_CACHE_TIMEOUT)
+    return html
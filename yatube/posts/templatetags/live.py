@@ -0,0 +1,14 @@
+from django import template
+from django.conf import settings
+from django.urls import reverse
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/live.html', takes_context=True)
+def live_feed(context, viewname, *args):
+    """Подписка на живую ленту на первой странице, если она включена."""
+    page = context.get('page_obj')
+    if not settings.LIVE_FEED_ENABLED or page is None or page.number != 1:
+        return {}
+    return {'live_url': reverse(viewname, args=args)}
@@ -0,0 +1,26 @@
+from django import template
+
+from posts import loaders
+
+register = template.Library()
+
+
+class StrictNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        with loaders.strict():
+            return self.nodelist.render(context)
+
+
+@register.tag
+def strict(parser, token):
+    """{% strict %}...{% endstrict %}: запросы внутри блока — ошибка.
+
+    Действует при DATALOADER_STRICT; данные должны быть подгружены
+    заранее через posts.loaders.
+    """
+    nodelist = parser.parse(('endstrict',))
+    parser.delete_first_token()
+    return StrictNode(nodelist)
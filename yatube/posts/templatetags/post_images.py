@@ -0,0 +1,38 @@
+import logging
+
+from django import template
+from django.conf import settings
+
+from posts import images, loaders
+
+register = template.Library()
+
+logger = logging.getLogger(__name__)
+
+
+@register.inclusion_tag('posts/includes/responsive_image.html')
+def responsive_image(post):
+    if not post.image:
+        return {}
+    try:
+        # Миниатюры sorl создаются и ищутся через свою таблицу:
+        # это не ленивые связи записи, строгий режим их пропускает
+        with loaders.loading():
+            variants = images.variants(post.image, post.image_width)
+            placeholder = images.placeholder(post.image)
+    except Exception:
+        # Как и тег thumbnail, не роняем страницу из-за битого файла
+        logger.exception('Не удалось подготовить картинку %s', post.image)
+        return {}
+    # src для браузеров без srcset: вариант шириной 960 или ближайший
+    fallback = next(
+        (im for im, width in variants if width >= 960), variants[-1][0]
+    )
+    return {
+        'src': fallback.url,
+        'srcset': ', '.join(f'{im.url} {w}w' for im, w in variants),
+        'sizes': settings.POST_IMAGE_SIZES,
+        'width': fallback.width,
+        'height': fallback.height,
+        'placeholder': placeholder,
+    }
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+User = get_user_model()
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='deleter')
+        cls.group = Group.objects.create(title='Группа', slug='soft')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, text='Удаляемая', group=self.group
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def delete(self, client):
+        return client.post(reverse('posts:post_delete', args=[self.post.pk]))
+
+    def test_author_deletes_post(self):
+        """Удалённая автором запись пропадает из лент и счётчиков."""
+        self.delete(self.client)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_stranger_cannot_delete(self):
+        """Чужую запись удалить нельзя."""
+        stranger = Client()
+        stranger.force_login(User.objects.create_user(username='stranger'))
+        self.delete(stranger)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='archivist')
+        cls.group = Group.objects.create(title='Архив', slug='archive')
+
+    def setUp(self):
+        cache.clear()
+        self.old = Post.objects.create(
+            author=self.author, text='Старая', group=self.group
+        )
+        self.comment = Comment.objects.create(
+            post=self.old, author=self.author, text='Старый комментарий'
+        )
+        self.fresh = Post.objects.create(
+            author=self.author, text='Свежая', group=self.group
+        )
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=800)
+        )
+
+    def archive(self):
+        call_command('archive_posts', '--batch-size=1', stdout=StringIO())
+
+    def test_old_posts_moved(self):
+        """Старые записи с комментариями переезжают в архив."""
+        self.archive()
+        self.assertEqual(list(Post.all_objects.all()), [self.fresh])
+        self.assertEqual(
+            list(ArchivedPost.objects.values_list('pk', 'text')),
+            [(self.old.pk, 'Старая')]
+        )
+        self.assertEqual(
+            ArchivedComment.objects.get().pk, self.comment.pk
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+
+    def test_archived_post_reachable(self):
+        """Страница архивной записи открывается по прежней ссылке."""
+        self.archive()
+        response = Client().get(
+            reverse('posts:post_detail', args=[self.old.pk])
+        )
+        self.assertContains(response, 'Старая')
+        self.assertContains(response, 'Старый комментарий')
+        self.assertTrue(response.context['archived'])
+
+    def test_deleted_post_stays_hidden(self):
+        """Удалённая запись в архиве не показывается и не вычитается дважды."""
+        self.old.deleted_at = timezone.now()
+        self.old.save(update_fields=['deleted_at'])
+        self.archive()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        response = Client().get(
+            reverse('posts:post_detail', args=[self.old.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_months_ago_clamps_day(self):
+        """Месяц назад от 31 марта — последний день февраля."""
+        moment = datetime(2024, 3, 31, 12, tzinfo=timezone.utc)
+        self.assertEqual(
+            archive.months_ago(1, moment),
+            datetime(2024, 2, 29, 12, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            archive.months_ago(15, moment).date(),
+            datetime(2022, 12, 31).date()
+        )
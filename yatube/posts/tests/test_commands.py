@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+# Команда обходит MEDIA_ROOT на диске, хранилище в памяти ей не подходит
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DEFAULT_FILE_STORAGE='posts.storage.ContentAddressedStorage'
+)
+class GcMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='gardener')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.kept = Post.objects.create(
+            author=self.user,
+            text='С картинкой',
+            image=ContentFile(b'kept', name='kept.gif')
+        ).image.name
+        self.orphan = default_storage.save(
+            'posts/orphan.gif', ContentFile(b'orphan')
+        )
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--min-age=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_keeps_files(self):
+        """В режиме dry-run файлы не удаляются."""
+        self.gc('--dry-run')
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_orphans_deleted(self):
+        """Удаляются только картинки, на которые нет ссылок."""
+        self.gc('--thumbnails')
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.kept))
+
+    def test_fresh_files_kept(self):
+        """Свежие файлы не удаляются: их пост мог ещё не сохраниться."""
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(os.path.exists(default_storage.path(self.orphan)))
+
+    def test_dry_run_keeps_thumbnail_records(self):
+        """dry-run только сообщает о записях sorl без файлов."""
+        gone = ImageFile('posts/gone.gif', default_storage)
+        gone.set_size((1, 1))
+        default.kvstore.set(gone)
+        output = self.gc('--dry-run', '--thumbnails')
+        self.assertIn('будет удалена запись sorl posts/gone.gif', output)
+        self.assertIsNotNone(default.kvstore.get(gone))
+        self.gc('--thumbnails')
+        self.assertIsNone(default.kvstore.get(gone))
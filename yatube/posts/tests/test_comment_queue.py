@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_queue
+from ..models import Comment, Post
+
+User = get_user_model()
+
+TEMP_QUEUE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    COMMENT_QUEUE_ENABLED=True,
+    COMMENT_QUEUE_PATH=os.path.join(TEMP_QUEUE_DIR, 'queue.sqlite3'),
+)
+class CommentQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.other = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_QUEUE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        comment_queue.drain()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comment_goes_to_queue(self):
+        """Комментарий сначала попадает в очередь, а не в БД."""
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Из очереди'}
+        )
+        self.assertFalse(Comment.objects.filter(text='Из очереди').exists())
+        self.assertEqual(comment_queue.size(), 1)
+
+    def test_author_sees_pending_comment(self):
+        """Автор видит свой комментарий до переноса в БД, другие нет."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Ожидает записи'}
+        )
+        self.assertContains(self.client.get(url), 'Ожидает записи')
+        reader = Client()
+        reader.force_login(self.other)
+        self.assertNotContains(reader.get(url), 'Ожидает записи')
+
+    def test_drain_saves_comments_in_batch(self):
+        """Обработчик очереди сохраняет комментарии пачкой."""
+        for i in range(3):
+            comment_queue.enqueue(self.post.id, self.user.id, f'Пачка {i}')
+        # Пачка пишется в точке сохранения: SAVEPOINT и RELEASE
+        with self.assertNumQueries(6):
+            self.assertEqual(comment_queue.drain(), 3)
+        self.assertEqual(
+            Comment.objects.filter(text__startswith='Пачка').count(), 3
+        )
+        self.assertEqual(comment_queue.size(), 0)
+        self.assertFalse(comment_queue.pending_for(self.post.id, self.user))
+
+    def test_repeated_drain_skips_saved_comments(self):
+        """Пачка, не удалённая из очереди после записи, не дублируется."""
+        comment_queue.enqueue(self.post.id, self.user.id, 'Один раз')
+        rows = comment_queue._connection().execute(
+            'SELECT client_id, post_id, author_id, text FROM pending'
+        ).fetchall()
+        comment_queue.drain()
+        # Сбой между фиксацией в БД и очисткой очереди
+        comment_queue._connection().executemany(
+            'INSERT INTO pending (client_id, post_id, author_id, text) '
+            'VALUES (?, ?, ?, ?)', rows
+        )
+        self.assertFalse(comment_queue.pending_for(self.post.id, self.user))
+        self.assertEqual(comment_queue.drain(), 1)
+        self.assertEqual(Comment.objects.filter(text='Один раз').count(), 1)
+
+    def test_deleted_author_does_not_block_queue(self):
+        """Комментарий удалённого автора не останавливает очередь."""
+        gone = User.objects.create_user(username='gone')
+        comment_queue.enqueue(self.post.id, gone.id, 'Пропадёт')
+        comment_queue.enqueue(self.post.id, self.user.id, 'Останется')
+        gone.delete()
+        self.assertEqual(comment_queue.drain(), 2)
+        self.assertEqual(comment_queue.size(), 0)
+        self.assertEqual(
+            list(Comment.objects.filter(
+                text__in=['Пропадёт', 'Останется']
+            ).values_list('text', flat=True)),
+            ['Останется']
+        )
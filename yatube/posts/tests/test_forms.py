@@ -1,14 +1,23 @@
 import shutil
 import tempfile
 
+from datetime import timedelta
 from http import HTTPStatus
+from io import BytesIO
+
+from PIL import Image
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
+from django.utils import timezone
 
+from .. import images
 from ..models import Comment, Group, Post
 
 User = get_user_model()
@@ -77,7 +86,9 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, self.post_author)
         self.assertEqual(post.group_id, form_data['group'])
-        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertRegex(
+            post.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
 
     def test_authorized_user_edit_post(self):
         """Проверка редактирования записи авторизированным клиентом."""
@@ -228,6 +239,109 @@ class TaskPagesTests(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text="Тестовый текст",
-                image="posts/small.gif"
+                image__startswith="posts/",
+                image__endswith=".gif"
             ).exists()
         )
+
+
+def make_image(size, fmt='JPEG', exif=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (200, 10, 10))
+    if exif is not None:
+        image.save(buffer, fmt, exif=exif)
+    else:
+        image.save(buffer, fmt)
+    return SimpleUploadedFile(
+        name=f'photo.{fmt.lower()}',
+        content=buffer.getvalue(),
+        content_type=f'image/{fmt.lower()}'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_DIMENSION=100)
+class ImageProcessingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_user = Client()
+        self.authorized_user.force_login(self.user)
+
+    def test_large_image_resized_and_reencoded(self):
+        """Большая картинка уменьшается, перекодируется и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        self.authorized_user.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': make_image((400, 200), exif=exif)}
+        )
+        post = Post.objects.get(text='Фото')
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertEqual(image.format, images.output_format())
+            self.assertNotIn(0x010F, image.getexif())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=512)
+    def test_oversized_upload_rejected(self):
+        """Файл больше лимита отклоняется с ошибкой формы."""
+        response = self.authorized_user.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тяжёлое фото', 'image': make_image((400, 400))}
+        )
+        self.assertFalse(Post.objects.filter(text='Тяжёлое фото').exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 512\xa0байт.'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_RELEASE_MIN_AGE=0)
+class ImageDeduplicationTests(TransactionTestCase):
+    # Файлы освобождаются в on_commit, поэтому нужны настоящие транзакции
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reposter')
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text='Репост',
+            image=make_image((50, 50), fmt='PNG')
+        )
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом до последней ссылки."""
+        first, second = self.create_post(), self.create_post()
+        self.assertEqual(first.image.name, second.image.name)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    @override_settings(IMAGE_RELEASE_MIN_AGE=60)
+    def test_deduplicated_upload_keeps_file(self):
+        """Файл, только что доставшийся загрузке, не удаляется."""
+        post = self.create_post()
+        storage, name = post.image.storage, post.image.name
+        data = storage.open(name).read()
+        storage.files[name] = (data, timezone.now() - timedelta(hours=1))
+        # Параллельная загрузка того же файла, её пост ещё не сохранён
+        self.assertEqual(
+            storage.save('posts/photo.png', ContentFile(data)), name
+        )
+        post.delete()
+        self.assertTrue(storage.exists(name))
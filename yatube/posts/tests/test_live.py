@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from .. import live
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class BrokerTests(TransactionTestCase):
+    def test_new_post_published(self):
+        """Новая запись попадает в каналы ленты, группы и автора."""
+        author = User.objects.create_user(username='writer')
+        group = Group.objects.create(title='Группа', slug='live_slug')
+        subscription = live.broker.subscribe([
+            live.INDEX, live.group_channel(group.id),
+            live.author_channel(author.id),
+        ])
+        self.addCleanup(subscription.close)
+        post = Post.objects.create(author=author, text='Текст', group=group)
+        self.assertEqual(subscription.get(0), [post.pk])
+
+    def test_unsubscribed_channel_not_kept(self):
+        """После отписки канал не остаётся в шине."""
+        subscription = live.broker.subscribe(['live_test'])
+        subscription.close()
+        self.assertNotIn('live_test', live.broker.channels)
+
+
+@override_settings(LIVE_FEED_ENABLED=True)
+class LiveViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Старый')
+
+    def open(self, url, client=None, **headers):
+        response = (client or Client()).get(url, **headers)
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return iter(response.streaming_content)
+
+    def test_follow_stream_pushes_new_posts(self):
+        """Подписчик получает id новых записей избранных авторов."""
+        client = Client()
+        client.force_login(self.reader)
+        chunks = self.open(reverse('posts:live_follow'), client)
+        self.assertIn(b'retry:', next(chunks))
+        live.publish_post(self.post)
+        self.assertEqual(
+            next(chunks),
+            f'id: {self.post.pk}\nevent: post\ndata: {self.post.pk}\n\n'
+            .encode()
+        )
+
+    def test_missed_posts_replayed(self):
+        """После переподключения приходят пропущенные записи."""
+        chunks = self.open(
+            reverse('posts:live_index'),
+            HTTP_LAST_EVENT_ID=str(self.post.pk - 1)
+        )
+        self.assertIn(f'id: {self.post.pk}\n'.encode(), next(chunks))
+
+    def test_subscribers_capped(self):
+        """Сверх LIVE_MAX_SUBSCRIBERS соединения получают 503."""
+        taken = len(live.broker.subscriptions)
+        with self.settings(LIVE_MAX_SUBSCRIBERS=taken):
+            response = Client().get(reverse('posts:live_index'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    def test_script_rendered_when_enabled(self):
+        """Включённая живая лента подписывает страницу ленты."""
+        self.assertContains(
+            Client().get(reverse('posts:index')), 'EventSource'
+        )
+
+
+class LiveDisabledTests(TestCase):
+    def test_disabled_by_default(self):
+        """По умолчанию живая лента выключена целиком."""
+        self.assertNotContains(
+            Client().get(reverse('posts:index')), 'EventSource'
+        )
+        response = Client().get(reverse('posts:live_index'))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import loaders
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class LoaderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.add_posts(3)
+
+    @classmethod
+    def add_posts(cls, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'author{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}', slug=f'group{number}'
+            )
+            post = Post.objects.create(
+                author=author, group=group, text=f'Пост {number}'
+            )
+            Comment.objects.create(post=post, author=author, text='Да')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_relations_loaded_in_batches(self):
+        """Связи страницы грузятся одним запросом на тип."""
+        # Записи, авторы, группы и счётчики
+        with self.assertNumQueries(4):
+            posts = loaders.hydrate(Post.objects.all())
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertTrue(post.author.username)
+                self.assertTrue(post.group.title)
+                self.assertEqual(post.comment_count, 1)
+
+    @override_settings(DATALOADER_STRICT=True)
+    def test_strict_mode_raises_on_lazy_query(self):
+        """В строгом режиме ленивый запрос при рендере — ошибка."""
+        post = Post.objects.first()
+        with self.assertRaises(loaders.LazyQueryError):
+            with loaders.strict():
+                post.author
+
+    def test_feed_queries_do_not_grow_with_page(self):
+        """Число запросов ленты не зависит от числа записей."""
+        client = Client()
+        # Первый просмотр заводит счётчик ленты
+        client.get(reverse('posts:index'))
+        cache.clear()
+        with CaptureQueriesContext(connection) as few:
+            client.get(reverse('posts:index'))
+        self.add_posts(5)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            client.get(reverse('posts:index'))
+        self.assertEqual(len(few), len(many))
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import notifications
+from ..models import Follow, Notification, Post
+
+User = get_user_model()
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', email='author@yatube.ru'
+        )
+        cls.followers = [
+            User.objects.create_user(
+                username=f'follower{i}', email=f'f{i}@yatube.ru'
+            )
+            for i in range(3)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=follower, author=cls.author)
+            for follower in cls.followers
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Новость')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.followers[0])
+
+    def test_followers_notified_in_one_batch(self):
+        """Подписчики получают уведомления одной пачкой."""
+        # Подписчики, пачка и SAVEPOINT/RELEASE транзакции
+        with self.assertNumQueries(4):
+            notifications.notify_followers(self.post)
+        self.assertEqual(
+            Notification.objects.filter(kind=Notification.NEW_POST).count(),
+            len(self.followers)
+        )
+
+    @override_settings(NOTIFICATIONS_BATCH_SIZE=1)
+    def test_failed_batch_leaves_no_partial_fanout(self):
+        """Сбой в поздней пачке откатывает все, повтор не дублирует."""
+        create = Notification.objects.bulk_create
+        calls = []
+
+        def failing_create(objs, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise IntegrityError('сбой второй пачки')
+            return create(objs, *args, **kwargs)
+
+        with mock.patch.object(
+            Notification.objects, 'bulk_create', side_effect=failing_create
+        ):
+            with self.assertRaises(IntegrityError):
+                notifications.notify_followers(self.post)
+        self.assertFalse(Notification.objects.exists())
+        notifications.notify_followers(self.post)
+        self.assertEqual(
+            Notification.objects.filter(post=self.post).count(),
+            len(self.followers)
+        )
+
+    def test_unread_counter_cached_and_reset(self):
+        """Счётчик непрочитанных кешируется и сбрасывается при чтении."""
+        notifications.notify_followers(self.post)
+        reader = self.followers[0]
+        self.assertEqual(notifications.unread_count(reader), 1)
+        with self.assertNumQueries(0):
+            notifications.unread_count(reader)
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertContains(response, self.post.text)
+        self.assertEqual(notifications.unread_count(reader), 0)
+
+    def test_comment_notifies_post_author(self):
+        """Комментарий к записи создаёт уведомление её автору."""
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'}
+        )
+        self.assertTrue(Notification.objects.filter(
+            user=self.author, kind=Notification.NEW_COMMENT
+        ).exists())
+
+    def test_digest_sent_once_per_user(self):
+        """Дайджест уходит одним письмом на пользователя и только раз."""
+        notifications.notify_followers(self.post)
+        self.assertEqual(notifications.send_digests(), len(self.followers))
+        self.assertEqual(len(mail.outbox), len(self.followers))
+        self.assertEqual(notifications.send_digests(), 0)
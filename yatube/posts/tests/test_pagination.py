@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters
+from ..models import FeedCounter, Follow, Group, Post
+from ..pagination import CountedPaginator
+
+User = get_user_model()
+
+
+class CountedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter')
+        cls.group = Group.objects.create(title='Первая', slug='first')
+        cls.other = Group.objects.create(title='Вторая', slug='second')
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self, key, queryset):
+        return CountedPaginator(queryset, 10, counter=key).count
+
+    def test_counters_follow_posts(self):
+        """Счётчики меняются вместе с записями без COUNT(*)."""
+        self.assertEqual(self.count(counters.INDEX, Post.objects.all()), 1)
+        post = Post.objects.create(
+            author=self.user, text='Ещё', group=self.group
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.count(counters.INDEX, Post.objects.all()), 2
+            )
+        post.delete()
+        self.assertEqual(
+            FeedCounter.objects.get(key=counters.INDEX).count, 1
+        )
+
+    def test_follow_count_reset_on_follow(self):
+        """Кеш числа записей ленты подписок сбрасывается при подписке."""
+        reader = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertEqual(
+            client.get(url).context['page_obj'].paginator.count, 0
+        )
+        Follow.objects.create(user=reader, author=self.user)
+        self.assertEqual(
+            len(client.get(url).context['page_obj']), 1
+        )
+
+    @override_settings(PAGINATOR_MAX_PAGES=3)
+    def test_page_count_capped(self):
+        """Число страниц ограничено PAGINATOR_MAX_PAGES."""
+        paginator = CountedPaginator(range(100), 10)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(list(paginator.page_range), [1, 2, 3])
+
+    def test_page_links_elided(self):
+        """Навигация показывает края и окно вокруг текущей страницы."""
+        paginator = CountedPaginator(range(1000), 10, max_pages=100)
+        ellipsis = CountedPaginator.ELLIPSIS
+        self.assertEqual(
+            paginator.page(50).page_links,
+            [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100]
+        )
+        self.assertEqual(
+            paginator.page(1).page_links, [1, 2, 3, ellipsis, 100]
+        )
+        self.assertEqual(
+            CountedPaginator(range(50), 10).page(3).page_links,
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_paginator_size_independent_of_pages(self):
+        """Разметка навигации не растёт с числом страниц."""
+        template = get_template('posts/includes/paginator.html')
+        sizes = {
+            template.render({'page_obj': CountedPaginator(
+                range(pages * 10), 10, max_pages=pages
+            ).page(pages // 2)}).count('page-item')
+            for pages in (100, 100000)
+        }
+        self.assertEqual(len(sizes), 1)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_guard import QueryGuard
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class RepeatedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        for number in range(4):
+            author = User.objects.create_user(username=f'author{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}', slug=f'group{number}'
+            )
+            cls.post = Post.objects.create(
+                author=author, group=group, text=f'Пост {number}'
+            )
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text='Комментарий')
+            Comment.objects.create(post=cls.post, author=author, text='Ответ')
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_pages_have_no_repeated_queries(self):
+        """Страницы не выполняют одинаковые запросы по разу на запись."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:group_list', kwargs={'slug': 'group0'}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:index_more'),
+            reverse('posts:comments_more', kwargs={'post_id': self.post.id}),
+        )
+        with QueryGuard(max_repeats=1) as guard:
+            for url in urls:
+                self.client.get(url)
+        guard.check()
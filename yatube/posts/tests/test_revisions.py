@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import revisions
+from ..models import Post
+
+User = get_user_model()
+
+
+class DeltaTests(TestCase):
+    def test_round_trip(self):
+        """Разница восстанавливает прежний текст без потерь."""
+        pairs = (
+            ('', 'Новый текст'),
+            ('Старый текст.\r\nВторая строка', 'Новый  текст!\nстрока'),
+            ('Удалить всё', ''),
+        )
+        for new, old in pairs:
+            with self.subTest(old=old):
+                delta = revisions.make_delta(new, old)
+                self.assertEqual(revisions.apply_delta(new, delta), old)
+
+    def test_size_follows_change(self):
+        """Размер разницы зависит от правки, а не от длины записи."""
+        old = ' '.join(f'слово{number}' for number in range(5000))
+        new = old.replace('слово2500', 'исправлено')
+        delta = revisions.make_delta(new, old)
+        self.assertLess(len(delta), 100)
+        self.assertEqual(revisions.apply_delta(new, delta), old)
+
+
+class HistoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='editor')
+        cls.post = Post.objects.create(author=cls.author, text='Версия 1')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def edit(self, text):
+        self.client.post(
+            reverse('posts:post_edit', args=[self.post.pk]), {'text': text}
+        )
+
+    def test_edits_recorded(self):
+        """Каждая правка текста сохраняет прежнюю версию."""
+        self.edit('Версия 2')
+        self.edit('Версия 2')
+        self.edit('Версия 3')
+        self.assertEqual(
+            [revision.number for revision in self.post.revisions.all()],
+            [2, 1]
+        )
+        self.assertEqual(
+            revisions.texts(self.post, 1), {1: 'Версия 1', 2: 'Версия 2'}
+        )
+
+    def test_concurrent_edit_takes_next_number(self):
+        """Занятый параллельной правкой номер версии не роняет запись."""
+        self.edit('Версия 2')
+
+        def stale_max(field):
+            # Первое чтение не видит версию, записанную параллельно
+            patcher.stop()
+            return Max(field) - 1
+
+        patcher = mock.patch('posts.revisions.Max', stale_max)
+        patcher.start()
+        self.edit('Версия 3')
+        self.assertEqual(
+            [revision.number for revision in self.post.revisions.all()],
+            [2, 1]
+        )
+
+    def test_history_page(self):
+        """Страница истории показывает автору все версии записи."""
+        self.edit('Версия 2')
+        self.edit('Версия 3')
+        response = self.client.get(
+            reverse('posts:post_history', args=[self.post.pk])
+        )
+        self.assertEqual(
+            [revision.text for revision in response.context['page_obj']],
+            ['Версия 2', 'Версия 1']
+        )
+        self.assertContains(response, 'Версия 3')
+
+    def test_history_hidden_from_others(self):
+        """Прежние версии записи не видны никому, кроме автора."""
+        self.edit('Версия 2')
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        url = reverse('posts:post_history', args=[self.post.pk])
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        for client in (Client(), reader):
+            with self.subTest(client=client):
+                self.assertRedirects(client.get(url), detail)
+
+    def test_delta_built_from_stored_text(self):
+        """Разница строится от текста в БД, а не от загруженного."""
+        stale = Post.objects.get(pk=self.post.pk)
+        self.edit('Версия 2')
+        stale.text = 'Версия 3'
+        stale.save()
+        self.assertEqual(
+            revisions.texts(stale, 1), {1: 'Версия 1', 2: 'Версия 2'}
+        )
+
+    def test_cached_versions_skip_deltas(self):
+        """Восстановленные версии берутся из кеша без чтения разниц."""
+        self.edit('Версия 2')
+        self.edit('Версия 3')
+        self.post.refresh_from_db()
+        revisions.texts(self.post, 1)
+        with CaptureQueriesContext(connection) as queries:
+            found = revisions.texts(self.post, 1)
+        self.assertEqual(found[1], 'Версия 1')
+        self.assertFalse(any(
+            '"delta"' in query['sql'] for query in queries.captured_queries
+        ))
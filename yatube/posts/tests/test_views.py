@@ -1,17 +1,25 @@
 import tempfile
+import warnings
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
+from django.utils import timezone
 from django.core.paginator import Page
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from posts.forms import PostForm
 
-from ..models import Follow, Group, Post
+from .. import notifications
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -162,6 +170,14 @@ class PostPagesTests(TestCase):
                 kwargs={'post_id': self.post.id}))
         self.check_post_info(response.context, False)
 
+    def test_image_rendered_with_srcset(self):
+        """Картинка выводится с srcset, lazy-загрузкой и заглушкой."""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'data:image/jpeg;base64,')
+
     def test_check_group_in_pages(self):
         """Проверяем создание поста на страницах с выбранной группой"""
         post = Post.objects.create(
@@ -343,3 +359,333 @@ class FollowViewsTest(TestCase):
         response = self.author_client.get(
             reverse('posts:follow_index'))
         self.assertNotIn(post, response.context['page_obj'].object_list)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='etag_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_feed_not_modified(self):
+        """Неизменившаяся лента отдаёт 304 без рендера страницы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                # Последняя запись ленты и версия лент
+                self.assertLessEqual(len(queries), 2)
+
+    def test_new_post_changes_etag(self):
+        """Новая запись меняет ETag ленты."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(author=self.user, text='Новый', group=self.group)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unread_count_changes_index_etag(self):
+        """Новое уведомление сразу меняет ETag главной."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:index')
+        etag = client.get(url)['ETag']
+        commenter = User.objects.create_user(username='commenter')
+        notifications.notify_comments([Comment.objects.create(
+            post=Post.objects.get(text='Пост'), author=commenter, text='Да'
+        )])
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit_seen_by_other_process(self):
+        """Правка меняет ETag и для процесса со своим кешем."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        etag = self.guest_client.get(url)['ETag']
+        post = Post.objects.get(text='Пост')
+        post.text = 'Исправленный'
+        post.save()
+        # Другой воркер: его кеш в памяти ничего о правке не знает
+        cache.clear()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленный')
+
+
+@override_settings(STREAMING_RENDER=True)
+class StreamingRenderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='streamer')
+        cls.post = Post.objects.create(author=cls.user, text='Первый')
+        Post.objects.create(author=cls.user, text='Второй')
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def stream(self, url):
+        response = self.guest_client.get(url)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_streamed(self):
+        """Шапка уходит первой, записи идут потоком до хвоста страницы."""
+        content = self.stream(reverse('posts:index'))
+        self.assertNotIn('<!-- stream -->', content)
+        self.assertLess(content.index('<header'), content.index('Второй'))
+        self.assertLess(content.index('Второй'), content.index('Первый'))
+        self.assertLess(content.index('Первый'), content.index('</html>'))
+
+    def test_comments_streamed(self):
+        """Комментарии к записи отдаются потоком."""
+        content = self.stream(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertIn('Комментарий', content)
+
+
+class FragmentViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='scroller')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(settings.NUMBER_OF_POSTS * 2 + 5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_scroll_through_feed(self):
+        """Фрагменты по курсору продолжают ленту без повторов."""
+        page = self.guest_client.get(reverse('posts:index'))
+        cursor = page.context['cursor']
+        seen = [post.pk for post in page.context['page_obj']]
+        while cursor:
+            response = self.guest_client.get(
+                reverse('posts:index_more'), {'cursor': cursor}
+            )
+            self.assertNotIn(b'<header', response.content)
+            seen += [post.pk for post in response.context['items']]
+            cursor = response.get('X-Next-Cursor')
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)]
+        )
+
+    @override_settings(PAGINATOR_MAX_PAGES=2)
+    def test_scroll_past_page_cap(self):
+        """С последней разрешённой страницы лента листается курсором."""
+        page = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(page.context['page_obj'].paginator.num_pages, 2)
+        cursor = page.context['cursor']
+        seen = [post.pk for post in page.context['page_obj']]
+        while cursor:
+            response = self.guest_client.get(
+                reverse('posts:index_more'), {'cursor': cursor}
+            )
+            seen += [post.pk for post in response.context['items']]
+            cursor = response.get('X-Next-Cursor')
+        self.assertEqual(
+            seen,
+            [post.pk for post in reversed(self.posts)][
+                settings.NUMBER_OF_POSTS:
+            ]
+        )
+
+    def test_cursor_does_not_load_cached_page(self):
+        """Курсор тёплой страницы из кеша не требует загрузки записей."""
+        url = reverse('posts:index')
+        cursor = self.guest_client.get(url).context['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['cursor'], cursor)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'posts_comment' in query['sql']
+        ])
+
+    @override_settings(NUMBER_OF_COMMENTS=2)
+    def test_comments_loaded_by_fragments(self):
+        """Под записью первые комментарии, остальные — фрагментом."""
+        post = self.posts[0]
+        for number in range(3):
+            Comment.objects.create(
+                post=post, author=self.user, text=f'Комментарий {number}'
+            )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertEqual(len(response.context['comments']), 2)
+        response = self.guest_client.get(
+            reverse('posts:comments_more', kwargs={'post_id': post.id}),
+            {'cursor': response.context['comments_cursor']}
+        )
+        self.assertContains(response, 'Комментарий 0')
+        self.assertFalse(response.has_header('X-Next-Cursor'))
+
+
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='grouper')
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy')
+        Post.objects.create(author=cls.user, text='Раз', group=cls.quiet)
+        for number in range(3):
+            Post.objects.create(author=cls.user, text='Два', group=cls.busy)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_aggregates_maintained(self):
+        """Число записей и дата последней ведутся при изменениях."""
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.post_count, 3)
+        latest = self.busy.posts.first()
+        self.assertEqual(self.busy.last_post_at, latest.pub_date)
+        latest.group = self.quiet
+        latest.save()
+        self.busy.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.busy.post_count, 2)
+        self.assertLess(self.busy.last_post_at, latest.pub_date)
+        self.assertEqual(self.quiet.post_count, 2)
+        self.assertEqual(self.quiet.last_post_at, latest.pub_date)
+
+    def test_deleted_post_move_keeps_counts(self):
+        """Перенос мягко удалённой записи не меняет счётчики групп."""
+        post = self.busy.posts.first()
+        post.deleted_at = timezone.now()
+        post.save()
+        post.group = self.quiet
+        post.save()
+        self.busy.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.busy.post_count, 2)
+        self.assertEqual(self.quiet.post_count, 1)
+
+    def test_directory_sorted_without_aggregation(self):
+        """Каталог сортируется по полям группы без GROUP BY."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:group_index'), {'sort': 'popular'}
+            )
+        self.assertEqual(
+            list(response.context['page_obj']), [self.busy, self.quiet]
+        )
+        self.assertFalse(any(
+            'GROUP BY' in query['sql'] for query in queries.captured_queries
+        ))
+        self.assertContains(response, 'Популярные группы')
+
+
+class HeaderCacheTests(TransactionTestCase):
+    # Шапки сбрасываются в on_commit, которого нет внутри TestCase
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='header')
+        self.group = Group.objects.create(title='Шапка', slug='header')
+        Post.objects.create(author=self.user, text='Текст', group=self.group)
+        self.guest_client = Client()
+
+    def lookups(self, url):
+        self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if '"posts_group"."slug" =' in query['sql']
+            or '"auth_user"."username" =' in query['sql']
+        ]
+
+    def test_warm_pages_skip_lookup(self):
+        """Тёплые страницы группы и профиля не ищут группу и автора."""
+        for url in (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                response, lookups = self.lookups(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(lookups, [])
+
+    def test_header_forgotten_on_save(self):
+        """Изменение группы и новая запись сбрасывают шапки."""
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        profile_url = reverse('posts:profile', args=[self.user.username])
+        self.guest_client.get(group_url)
+        self.guest_client.get(profile_url)
+        self.group.refresh_from_db()
+        self.group.title = 'Новая шапка'
+        self.group.save()
+        Post.objects.create(author=self.user, text='Ещё', group=self.group)
+        self.assertContains(self.guest_client.get(group_url), 'Новая шапка')
+        self.assertEqual(
+            self.guest_client.get(group_url)
+            .context['page_obj'].paginator.count, 2
+        )
+        self.assertEqual(
+            self.guest_client.get(profile_url)
+            .context['page_obj'].paginator.count, 2
+        )
+
+    def test_cyrillic_username_cached(self):
+        """Кириллический username не попадает в ключ кеша как есть."""
+        author = User.objects.create_user(username='автор')
+        url = reverse('posts:profile', args=[author.username])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            response, lookups = self.lookups(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lookups, [])
+
+    def test_unknown_slug_not_found(self):
+        """Несуществующая группа по-прежнему даёт 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class IndexCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fresh')
+        self.guest_client = Client()
+
+    def test_new_and_edited_post_shown_at_once(self):
+        """Новая и изменённая запись сразу видны на первой странице."""
+        url = reverse('posts:index')
+        post = Post.objects.create(author=self.user, text='Первая')
+        self.assertContains(self.guest_client.get(url), 'Первая')
+        Post.objects.create(author=self.user, text='Вторая')
+        self.assertContains(self.guest_client.get(url), 'Вторая')
+        post.text = 'Исправленная'
+        post.save()
+        self.assertContains(self.guest_client.get(url), 'Исправленная')
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class OversizedUpload(UploadedFile):
+    """Заглушка вместо файла, превысившего лимит размера."""
+
+    oversized = True
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Отбрасывает файл, как только он превысил POST_IMAGE_MAX_UPLOAD_SIZE.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: лишние куски не доходят
+    до следующих обработчиков и не попадают ни в память, ни на диск.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = bool(
+            self.content_length
+            and self.content_length > settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.oversized = True
+        return None if self.oversized else raw_data
+
+    def file_complete(self, file_size):
+        if not self.oversized:
+            return None
+        return OversizedUpload(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=self.received,
+        )
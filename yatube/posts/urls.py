@@ -7,6 +7,8 @@ app_name = 'posts'
 urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
+    # Каталог сообществ
+    path('groups/', views.group_index, name='group_index'),
     # Страница сообщества
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     # Профайл пользователя
@@ -17,6 +19,18 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     # Редактирование поста
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    # Удаление поста
+    path(
+        'posts/<int:post_id>/delete/',
+        views.post_delete,
+        name='post_delete'
+    ),
+    # История правок
+    path(
+        'posts/<int:post_id>/history/',
+        views.post_history,
+        name='post_history'
+    ),
     # Комментарии
     path(
         'posts/<int:post_id>/comment/',
@@ -25,6 +39,30 @@ urlpatterns = [
     ),
     # Посты подписанных авторов
     path('follow/', views.follow_index, name='follow_index'),
+    # Уведомления
+    path(
+        'notifications/',
+        views.notification_list,
+        name='notifications'
+    ),
+    # Фрагменты лент и комментариев для бесконечной прокрутки
+    path('more/', views.index_more, name='index_more'),
+    path('group/<slug:slug>/more/', views.group_more, name='group_more'),
+    path(
+        'profile/<str:username>/more/',
+        views.profile_more,
+        name='profile_more'
+    ),
+    path('follow/more/', views.follow_more, name='follow_more'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments_more,
+        name='comments_more'
+    ),
+    # Живая лента: id новых записей через Server-Sent Events
+    path('live/', views.live_index, name='live_index'),
+    path('live/group/<slug:slug>/', views.live_group, name='live_group'),
+    path('live/follow/', views.live_follow, name='live_follow'),
     # Подписаться на автора
     path(
         'profile/<str:username>/follow/',
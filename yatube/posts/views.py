@@ -1,43 +1,112 @@
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.http import condition, require_POST
+
+from core.tasks import enqueue
 
+from . import (
+    archive, comment_queue, conditions, counters, fragments, headers, live,
+    loaders, notifications, revisions
+)
 from .forms import CommentForm, PostForm
-from .models import Group, Follow, Post
+from .models import ArchivedPost, Group, Follow, Post
+from .pagination import CountedPaginator
+from .streaming import stream_render
 
 User = get_user_model()
 
+GROUP_ORDERINGS = {
+    'active': ('-last_post_at', '-pk'),
+    'popular': ('-post_count', '-pk'),
+    'title': ('title', 'pk'),
+}
+
 
-def paginat(queryset, request):
-    paginator = Paginator(queryset, settings.NUMBER_OF_POSTS)
+def paginat(queryset, request, **count_options):
+    paginator = CountedPaginator(
+        queryset, settings.NUMBER_OF_POSTS, **count_options
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def feed_page(queryset, request, **count_options):
+    # Связи записей догружаются пачками при первом обращении к странице
+    page_obj = paginat(queryset, request, **count_options)
+    # Курсор подгрузки считается здесь: шаблон может взять записи
+    # из кеша фрагмента и не выбирать их вовсе; за последней
+    # разрешённой страницей лента продолжается только курсором
+    has_more = page_obj.has_next() or page_obj.paginator.truncated
+    page_obj.next_cursor = has_more and fragments.last_cursor(
+        page_obj.object_list, 'pub_date'
+    )
+    page_obj.object_list = loaders.PostLoader(page_obj.object_list)
+    return page_obj
+
+
+def render_feed(request, template_name, context):
+    return stream_render(
+        request, template_name, context, context['page_obj'],
+        'posts/includes/single_post.html', 'post', separator='<hr>'
+    )
+
+
+def on_post_saved(post):
+    # Побочные эффекты сохранения выполняет воркер, а не запрос;
+    # пока задача ждёт в очереди, новые сохранения её не дублируют:
+    # воркер прочитает запись в последнем состоянии
+    enqueue('posts.post_saved', key=f'post_saved:{post.pk}', post_id=post.pk)
+
+
+@condition(etag_func=conditions.index_etag)
 def index(request):
     context = {
-        'page_obj': paginat(
-            Post.objects.select_related('author', 'group'),
-            request
-        )
+        'page_obj': feed_page(
+            Post.objects.all(), request, counter=counters.INDEX
+        ),
+        'index_cache_timeout': settings.INDEX_CACHE_TIMEOUT,
+        'index_version': conditions.feed_versions(request)[1],
     }
-    return render(request, 'posts/index.html', context)
+    return render_feed(request, 'posts/index.html', context)
 
 
+@condition(etag_func=conditions.group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = headers.get_group(slug)
     context = {
         'group': group,
-        'page_obj': paginat(group.posts.select_related('author'), request)
+        'page_obj': feed_page(
+            Post.objects.filter(group_id=group.id), request,
+            count=counters.group_count(group.id)
+        )
     }
-    return render(request, 'posts/group_list.html', context)
+    return render_feed(request, 'posts/group_list.html', context)
 
 
+def group_index(request):
+    # Сортировка по денормализованным полям идёт по индексам Group
+    sort = request.GET.get('sort')
+    if sort not in GROUP_ORDERINGS:
+        sort = 'active'
+    context = {
+        'page_obj': paginat(
+            Group.objects.order_by(*GROUP_ORDERINGS[sort]), request
+        ),
+        'sort': sort,
+        'page_query': f'sort={sort}&',
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@condition(etag_func=conditions.profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = headers.get_author(username)
     following = (request.user.is_authenticated
                  and request.user != author
                  and Follow.objects.filter(
@@ -47,20 +116,53 @@ def profile(request, username):
     context = {
         'author': author,
         'following': following,
-        'page_obj': paginat(author.posts.select_related('author'), request)
+        'page_obj': feed_page(
+            Post.objects.filter(author_id=author.id), request,
+            counter=counters.author_key(author.id)
+        )
     }
-    return render(request, 'posts/profile.html', context)
+    return render_feed(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = archive.find_post(post_id)
     form = CommentForm()
     template = 'posts/post_detail.html'
+    comments, comments_cursor = fragments.take(
+        post.comments.select_related('author'), None, 'created',
+        settings.NUMBER_OF_COMMENTS
+    )
     context = {
         'post': post,
         'form': form,
+        'pending_comments': comment_queue.pending_for(post.id, request.user),
+        'comments': comments,
+        'comments_cursor': comments_cursor,
+        'archived': isinstance(post, ArchivedPost),
     }
-    return render(request, template, context)
+    return stream_render(
+        request, template, context, comments,
+        'posts/includes/comment.html', 'comment'
+    )
+
+
+def post_history(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author'), pk=post_id
+    )
+    # Прежние версии видит только автор записи
+    if not request.user == post.author:
+        return redirect('posts:post_detail', post.pk)
+    # Разницы не выбираются: готовые тексты версий обычно в кеше
+    page_obj = paginat(post.revisions.defer('delta'), request)
+    page_obj.object_list = revisions.attach_texts(
+        post, page_obj.object_list
+    )
+    context = {
+        'post': post,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/post_history.html', context)
 
 
 @login_required
@@ -71,6 +173,11 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    on_post_saved(post)
+    enqueue(
+        'posts.notify_followers',
+        key=f'notify_followers:{post.pk}', post_id=post.pk
+    )
     return redirect('posts:profile', post.author)
 
 
@@ -90,19 +197,41 @@ def post_edit(request, post_id):
             'posts/create_post.html',
             {'form': form, 'post': post, 'is_edit': True}
         )
-    form.save()
+    # Прежний текст для истории правок читается в одной
+    # транзакции с UPDATE (posts.revisions.replaced_text)
+    with transaction.atomic():
+        post = form.save()
+    on_post_saved(post)
     return redirect('posts:post_detail', post.pk)
 
 
+@login_required
+@require_POST
+def post_delete(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    if not request.user == post.author:
+        return redirect('posts:post_detail', post.pk)
+    post.deleted_at = timezone.now()
+    post.save(update_fields=['deleted_at'])
+    return redirect('posts:profile', request.user.username)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+    if not form.is_valid():
+        return redirect('posts:post_detail', post_id=post_id)
+    if settings.COMMENT_QUEUE_ENABLED:
+        comment_queue.enqueue(
+            post.id, request.user.id, form.cleaned_data['text']
+        )
+        return redirect('posts:post_detail', post_id=post_id)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    notifications.notify_comments([comment])
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -111,12 +240,76 @@ def follow_index(request):
     posts = Post.objects.filter(
         author__following__user=request.user)
     context = {
-        'page_obj': paginat(
+        'page_obj': feed_page(
             posts,
-            request
+            request,
+            cache_key=counters.follow_cache_key(
+                request.user.id, conditions.feed_versions(request)[0]
+            )
         )
     }
-    return render(request, 'posts/follow.html', context)
+    return render_feed(request, 'posts/follow.html', context)
+
+
+def post_fragment(request, queryset, **context):
+    return fragments.render_fragment(
+        request, 'posts/includes/post_fragment.html', queryset,
+        'pub_date', settings.NUMBER_OF_POSTS, context,
+        prepare=loaders.hydrate
+    )
+
+
+def index_more(request):
+    return post_fragment(request, Post.objects.all())
+
+
+def group_more(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return post_fragment(request, group.posts.all(), group=group)
+
+
+def profile_more(request, username):
+    author = get_object_or_404(User, username=username)
+    return post_fragment(request, author.posts.all())
+
+
+@login_required
+def follow_more(request):
+    return post_fragment(request, Post.objects.filter(
+        author__following__user=request.user
+    ))
+
+
+def comments_more(request, post_id):
+    post = archive.find_post(post_id)
+    return fragments.render_fragment(
+        request, 'posts/includes/comment_fragment.html',
+        post.comments.select_related('author'), 'created',
+        settings.NUMBER_OF_COMMENTS
+    )
+
+
+def live_index(request):
+    return live.stream(request, [live.INDEX], Post.objects)
+
+
+def live_group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return live.stream(
+        request, [live.group_channel(group.id)], group.posts
+    )
+
+
+@login_required
+def live_follow(request):
+    authors = Follow.objects.filter(
+        user=request.user
+    ).values_list('author_id', flat=True)
+    return live.stream(
+        request,
+        [live.author_channel(author_id) for author_id in authors],
+        Post.objects.filter(author_id__in=authors)
+    )
 
 
 @login_required
@@ -132,3 +325,15 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.get(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+@login_required
+def notification_list(request):
+    page_obj = paginat(
+        request.user.notifications.select_related('actor', 'post'),
+        request
+    )
+    context = {'page_obj': page_obj}
+    response = render(request, 'posts/notifications.html', context)
+    notifications.mark_read(request.user, page_obj)
+    return response
@@ -0,0 +1,13 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .hashers import timed
+
+
+class TimedModelBackend(ModelBackend):
+    """ModelBackend с замером всего входа: запрос, проверка, перехеш."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        with timed('login', 'authenticate'):
+            return super().authenticate(
+                request, username=username, password=password, **kwargs
+            )
@@ -0,0 +1,102 @@
+"""Хешеры паролей со стоимостью из настроек и замером времени.
+
+Стоимость берётся из PASSWORD_* при каждом обращении, поэтому после
+её изменения Django сам перехеширует пароль при следующем входе
+(must_update). Время хеширования и входа копится в гистограммах
+latency, которые раз в AUTH_LATENCY_REPORT_SECONDS пишутся в лог;
+всё, что дольше AUTH_LATENCY_BUDGET_MS, пишется в лог сразу.
+Подобрать стоимость под бюджет помогает команда bench_hashers.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Гистограммы по (алгоритм или 'login', операция), в мс
+latency = {}
+
+_state = threading.local()
+_last_report = time.monotonic()
+
+
+def report():
+    global _last_report
+    _last_report = time.monotonic()
+    for line in metrics.lines(latency):
+        logger.info(line)
+
+
+@contextmanager
+def timed(name, kind):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        milliseconds = (time.perf_counter() - started) * 1000
+        metrics.observe(latency, (name, kind), milliseconds)
+        if milliseconds > settings.AUTH_LATENCY_BUDGET_MS:
+            logger.warning(
+                '%s %s: %.0f мс при бюджете %s мс', name, kind,
+                milliseconds, settings.AUTH_LATENCY_BUDGET_MS
+            )
+        if (time.monotonic() - _last_report
+                > settings.AUTH_LATENCY_REPORT_SECONDS):
+            report()
+
+
+class TimedHasherMixin:
+    # verify у PBKDF2 вызывает encode: вложенный вызов не замеряется
+
+    def _timed(self, kind, method, *args, **kwargs):
+        if getattr(_state, 'busy', False):
+            return method(*args, **kwargs)
+        _state.busy = True
+        try:
+            with timed(self.algorithm, kind):
+                return method(*args, **kwargs)
+        finally:
+            _state.busy = False
+
+    def encode(self, *args, **kwargs):
+        return self._timed('encode', super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return self._timed('verify', super().verify, *args, **kwargs)
+
+
+class PBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(TimedHasherMixin, hashers.Argon2PasswordHasher):
+    """Нужен пакет argon2-cffi."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(TimedHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    """Нужен пакет bcrypt."""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
@@ -0,0 +1,53 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+from core import metrics
+from users import hashers
+
+
+class Command(BaseCommand):
+    help = ('Замеряет хеширование и проверку пароля каждым хешером '
+            'из PASSWORD_HASHERS при текущей стоимости.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        budget = settings.AUTH_LATENCY_BUDGET_MS
+        self.stdout.write(
+            f'{"алгоритм":<20}{"encode, мс":>12}{"verify, мс":>12}'
+        )
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode('password', hasher.salt())
+            except ValueError as error:
+                # Хешер без установленной библиотеки
+                self.stdout.write(f'{hasher.algorithm:<20}{error}')
+                continue
+            encode = self.median(
+                options['repeat'],
+                lambda: hasher.encode('password', hasher.salt())
+            )
+            verify = self.median(
+                options['repeat'], lambda: hasher.verify('password', encoded)
+            )
+            mark = '  > бюджета' if verify > budget else ''
+            self.stdout.write(
+                f'{hasher.algorithm:<20}{encode:>12.1f}{verify:>12.1f}{mark}'
+            )
+        # Те же замеры глазами хешеров users.hashers
+        for line in metrics.lines(hashers.latency):
+            self.stdout.write(line)
+
+    @staticmethod
+    def median(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
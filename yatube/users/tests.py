@@ -0,0 +1,62 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+
+from . import hashers
+
+User = get_user_model()
+
+
+@override_settings(
+    PASSWORD_HASHERS=[
+        'users.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ],
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+class PasswordHasherTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='hasher', password='secret-pass'
+        )
+
+    def login(self):
+        return authenticate(username='hasher', password='secret-pass')
+
+    def test_legacy_hash_upgraded_on_login(self):
+        """Пароль со старым алгоритмом перехешируется при входе."""
+        self.user.password = make_password(
+            'secret-pass', hasher='pbkdf2_sha1'
+        )
+        self.user.save()
+        self.assertEqual(self.login(), self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_cost_change_upgraded_on_login(self):
+        """После смены стоимости пароль перехешируется с новой."""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.login()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_timed(self):
+        """Вход попадает в гистограмму, а превышение бюджета — в лог."""
+        hashers.latency.clear()
+        with self.settings(AUTH_LATENCY_BUDGET_MS=0):
+            with self.assertLogs('users.hashers', 'WARNING'):
+                self.login()
+        self.assertEqual(hashers.latency['login', 'authenticate'].total, 1)
+        # encode внутри verify не считается отдельно
+        self.assertEqual(hashers.latency['pbkdf2_sha256', 'verify'].total, 1)
+        self.assertNotIn(('pbkdf2_sha256', 'encode'), hashers.latency)
+
+    def test_latency_reported_periodically(self):
+        """Гистограммы входа периодически пишутся в лог."""
+        hashers.latency.clear()
+        with self.settings(AUTH_LATENCY_REPORT_SECONDS=0):
+            with self.assertLogs('users.hashers', 'INFO') as logs:
+                self.login()
+        self.assertTrue(any(
+            'login authenticate: n=1' in line for line in logs.output
+        ))
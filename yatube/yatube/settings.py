@@ -52,12 +52,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -76,6 +78,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.notifications',
             ],
         },
     },
@@ -113,6 +116,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Первый хешер — основной. Пароли с другим алгоритмом или другой
+# стоимостью перехешируются при входе. Argon2 и bcrypt требуют пакетов
+# argon2-cffi и bcrypt; чтобы перейти на них, поставьте пакет и
+# поднимите хешер в начало списка
+PASSWORD_HASHERS = [
+    'users.hashers.PBKDF2PasswordHasher',
+    'users.hashers.Argon2PasswordHasher',
+    'users.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = 150000
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 512
+PASSWORD_ARGON2_PARALLELISM = 2
+PASSWORD_BCRYPT_ROUNDS = 12
+# Вход и хеширование дольше стольких миллисекунд пишутся в лог
+AUTH_LATENCY_BUDGET_MS = 250
+# Как часто (сек) гистограммы времени входа пишутся в лог
+AUTH_LATENCY_REPORT_SECONDS = 300
+
+AUTHENTICATION_BACKENDS = ['users.backends.TimedModelBackend']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -135,6 +160,20 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'), ]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# В продакшене имена статики содержат хеш, а collectstatic кладёт рядом
+# сжатые копии .gz/.br
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.storage.CompressedManifestStaticFilesStorage'
+    )
+
+# Раздавать STATIC_ROOT и MEDIA_ROOT прямо из WSGI (core.fileserve)
+SERVE_FILES_IN_WSGI = not DEBUG
+# Размер пула потоков, в котором yatube.asgi выполняет запросы
+ASGI_THREADS = 32
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -145,6 +184,57 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NUMBER_OF_POSTS = 10
+# Комментарии под записью сразу, остальные подгружаются фрагментами
+NUMBER_OF_COMMENTS = 50
+# Сколько секунд кешируется число записей ленты подписок и сколько
+# страниц ленты доступно через ?page= (дальше — бесконечная прокрутка)
+PAGINATOR_COUNT_TIMEOUT = 300
+PAGINATOR_MAX_PAGES = 1000
+# Блок самых больших групп: размер и время жизни кеша в секундах
+TOP_GROUPS_SIZE = 5
+TOP_GROUPS_CACHE_TIMEOUT = 300
+# Сколько секунд живут шапки страниц группы и профиля (posts.headers)
+HEADER_CACHE_TIMEOUT = 3600
+# Сколько секунд кешируются восстановленные версии записей
+REVISION_CACHE_TIMEOUT = 3600
+# Записи старше стольких месяцев команда archive_posts переносит
+# в архив пачками по ARCHIVE_BATCH_SIZE
+ARCHIVE_AFTER_MONTHS = 12
+ARCHIVE_BATCH_SIZE = 500
+# Частота записи (core.ratelimit): лимиты по имени view для вошедшего
+# пользователя и для IP; methods — какие запросы считаются
+RATE_LIMITS = {
+    'posts:post_create': {'user': '5/m', 'ip': '30/m'},
+    'posts:add_comment': {'user': '10/m', 'ip': '60/m'},
+    'posts:profile_follow': {'methods': ('GET',), 'user': '30/m'},
+    'users:signup': {'ip': '5/h'},
+}
+# Откуда брать адрес клиента; за прокси — например, HTTP_X_FORWARDED_FOR
+RATELIMIT_IP_HEADER = 'REMOTE_ADDR'
+# Сколько своих прокси дописывают адрес в RATELIMIT_IP_HEADER: клиент —
+# столько-то записей с конца, всё левее мог подставить он сам
+RATELIMIT_PROXY_HOPS = 1
+# Сколько секунд живёт кеш ленты на главной
+INDEX_CACHE_TIMEOUT = 20
+
+# Лента и комментарии отдаются потоком: шапка страницы уходит клиенту
+# до того, как отрендерены записи
+STREAMING_RENDER = False
+
+# Ошибка на любой ленивый запрос при рендере лент (posts.loaders)
+DATALOADER_STRICT = DEBUG
+
+# Живая лента (posts.live). Включать только под ASGI (yatube.asgi):
+# под WSGI каждая открытая вкладка держит поток сервера. Подписчиков
+# на процесс не больше LIVE_MAX_SUBSCRIBERS, остальные получают 503
+LIVE_FEED_ENABLED = False
+LIVE_MAX_SUBSCRIBERS = 100
+# Период пинга соединения в секундах, пауза перед переподключением
+# браузера и длина очереди подписчика
+LIVE_HEARTBEAT = 15
+LIVE_RETRY_MS = 5000
+LIVE_BUFFER_SIZE = 100
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Static files (CSS, JavaScript, Images)
@@ -152,9 +242,65 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Картинки постов хранятся по хешу содержимого без дублей,
+# миниатюры sorl — обычными файлами
+DEFAULT_FILE_STORAGE = 'posts.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Освобождённая картинка моложе стольких секунд не удаляется сразу:
+# её дубль мог достаться ещё не сохранённому посту (posts.signals)
+IMAGE_RELEASE_MIN_AGE = 60
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Отложенная запись комментариев: при включении add_comment кладёт
+# комментарий в локальную очередь, а команда drain_comments переносит
+# накопленное в БД пачками
+COMMENT_QUEUE_ENABLED = False
+COMMENT_QUEUE_PATH = os.path.join(BASE_DIR, 'comment_queue.sqlite3')
+COMMENT_QUEUE_BATCH_SIZE = 500
+
+# Фоновые задачи (core.tasks): выполняются командой run_worker
+TASKS_ALWAYS_EAGER = False
+TASKS_BATCH_SIZE = 100
+TASKS_MAX_RETRIES = 5
+# Задержка перед повтором, сек: растёт вдвое с каждой попыткой
+TASKS_RETRY_BACKOFF = 2
+TASKS_RETRY_BACKOFF_MAX = 600
+TASKS_KEEP_DONE_DAYS = 7
+# Задача в статусе running дольше этого, сек, считается брошенной
+# упавшим воркером и возвращается в очередь
+TASKS_LEASE_TIMEOUT = 600
+
+# Уведомления подписчиков
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_UNREAD_TTL = 60 * 60
+# Адрес сайта для ссылок в письмах-дайджестах
+SITE_URL = 'http://127.0.0.1:8000'
+
+# Обработка загружаемых картинок постов
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandlers.MaxSizeUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_DIMENSION = 1920
+# Тело запроса больше этого yatube.asgi не читает и отвечает 413;
+# сверх картинки — запас на поля формы и разметку multipart
+ASGI_MAX_BODY_SIZE = POST_IMAGE_MAX_UPLOAD_SIZE + 5 * 1024 * 1024
+# WEBP, если Pillow собран с libwebp, иначе прогрессивный JPEG
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 80
+# Ширины вариантов для srcset и подсказка браузеру о ширине кадра
+POST_IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1920]
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
+# Сжатие ответов (core.middleware.CompressionMiddleware); brotli
+# используется, если установлен пакет brotli
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_LEVEL = 5
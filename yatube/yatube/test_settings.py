@@ -0,0 +1,36 @@
+"""Настройки для тестов.
+
+manage.py test и pytest подхватывают их сами. База в памяти
+без миграций, файлы в памяти процесса, письма в mail.outbox;
+manage.py test по умолчанию идёт параллельно на всех ядрах.
+"""
+from .settings import *  # noqa: F401,F403
+
+
+class DisableMigrations:
+    # Схема создаётся прямо по моделям, без прогона всех миграций
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return None
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+MIGRATION_MODULES = DisableMigrations()
+
+# Стойкость хеша в тестах не нужна, а PBKDF2 занимает львиную долю
+# времени каждого create_user и login
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DEFAULT_FILE_STORAGE = 'posts.storage.InMemoryContentAddressedStorage'
+THUMBNAIL_STORAGE = 'core.storage.InMemoryStorage'
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+TEST_RUNNER = 'core.testrunner.ParallelTestRunner'